@@ -0,0 +1,421 @@
+"""
+Benchmarks building synthetic scenes of every blueprint type at growing scale.
+
+Run it headless with Blender:
+    blender -b --python benchmark.py -- --output results.json
+or with bpy as a module:
+    python benchmark.py --output results.json
+
+The time of the first boxbuilder import is always recorded as stage "import".
+Use --geometry-only to measure the pure-Python geometry path without creating Blender objects (this also
+runs without Blender) and --compare to print the ratios to an earlier result file.
+
+peakRssBytes is the high-water mark of the whole process so far (ru_maxrss), not the memory of a single
+stage: it only grows and is dominated by the largest scene measured before.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The first import of boxbuilder is part of the benchmark
+importStart = time.perf_counter()
+import boxbuilder
+
+importSeconds = time.perf_counter() - importStart
+
+from instrumentation import Level, instrumentation
+from boxbuilder import (
+    BlueprintContainer,
+    BooleanOperation,
+    BoxBlueprint,
+    ChangingPalisadeBlueprint,
+    ConeBlueprint,
+    CuboidBlueprint,
+    CylinderBlueprint,
+    Frame3dBlueprint,
+    Palisade,
+    PrismBlueprint,
+    # With bpy as a module, mathutils is only importable after bpy, which boxbuilder imports
+    Vector,
+)
+
+defaultScales = [10, 100, 1000, 10000]
+
+
+def peakRss() -> int:
+    """
+    The peak resident set size of this process since it started in bytes or None if it cannot be
+    determined. It never decreases, so it is not a per-stage figure.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(),
+            ctypes.byref(counters),
+            counters.cb,
+        )
+        return counters.PeakWorkingSetSize
+
+    return None
+
+
+def gridPosition(index: int, spacing=3.0) -> Vector:
+    """Places the blueprints of a scene on a square grid so they do not overlap."""
+    rowLength = 100
+    return Vector(((index // rowLength) * spacing, (index % rowLength) * spacing, 0))
+
+
+# Scenes. Each function returns the root blueprints of a scene with the given number of blueprints.
+
+
+def cuboidScene(count):
+    cuboids = []
+    for index in range(count):
+        cuboid = CuboidBlueprint(None, f"Cuboid{index}")
+        cuboid.backleftbot = gridPosition(index)
+        cuboids.append(cuboid)
+    return cuboids
+
+
+def boxScene(count):
+    return [
+        BoxBlueprint(None, f"Box{index}", *gridPosition(index), thickness=0.02)
+        for index in range(count)
+    ]
+
+
+def prismScene(count):
+    return [
+        PrismBlueprint(None, f"Prism{index}", offset=gridPosition(index))
+        for index in range(count)
+    ]
+
+
+def cylinderScene(count):
+    return [
+        CylinderBlueprint(None, f"Cylinder{index}", offset=gridPosition(index))
+        for index in range(count)
+    ]
+
+
+def coneScene(count):
+    return [
+        ConeBlueprint(None, f"Cone{index}", offset=gridPosition(index))
+        for index in range(count)
+    ]
+
+
+def squarePoints(position: Vector) -> list[Vector]:
+    return [
+        position + Vector(corner)
+        for corner in ((0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0))
+    ]
+
+
+def palisadeScene(count):
+    return [
+        Palisade(f"Palisade{index}", None, squarePoints(gridPosition(index)))
+        for index in range(count)
+    ]
+
+
+def changingPalisadeScene(count):
+    return [
+        ChangingPalisadeBlueprint(
+            f"ChangingPalisade{index}",
+            None,
+            squarePoints(gridPosition(index)),
+            squarePoints(gridPosition(index) + Vector((0.2, 0.2, 1))),
+        )
+        for index in range(count)
+    ]
+
+
+def frameScene(count):
+    return [
+        Frame3dBlueprint(None, f"Frame3d{index}", botLeft=gridPosition(index))
+        for index in range(count)
+    ]
+
+
+def booleanChainScene(count):
+    """The cylinder minus cone minus hex prism chain of the boxbuilder demo."""
+    cylinders = []
+    for index in range(count):
+        position = gridPosition(index)
+        cylinder = CylinderBlueprint(
+            None, f"Cylinder{index}", height=2, radius=1, offset=position
+        )
+        cone = ConeBlueprint(
+            None,
+            f"Cone{index}",
+            radius1=0,
+            radius2=1,
+            height=1.0,
+            offset=position + Vector((0, 0, 0.5)),
+        )
+        hexPrism = PrismBlueprint(
+            None,
+            f"HexPrism{index}",
+            offset=position,
+            sideCount=6,
+            height=1.0001,
+            topRadius=0.9,
+            botRadius=0.8,
+        )
+        cylinder.addBooleanOperation(cone, BooleanOperation.Difference)
+        cylinder.addBooleanOperation(hexPrism, BooleanOperation.Difference)
+        cylinders.append(cylinder)
+    return cylinders
+
+
+def cuboidBooleanScene(count):
+    """Cuboids with two notches, computed exactly by boxcsg instead of boolean modifiers."""
+    cuboids = []
+    for index in range(count):
+        position = gridPosition(index)
+        cuboid = CuboidBlueprint(None, f"NotchedCuboid{index}", 0, 1, 0, 1, 0, 1)
+        cuboid.offset = position
+        for notchIndex, y in enumerate((0.2, 0.6)):
+            notch = CuboidBlueprint(
+                None, f"Notch{index}_{notchIndex}", y, y + 0.2, 0.5, 1.5, -0.5, 0.5
+            )
+            notch.offset = position
+            cuboid.addBooleanOperation(notch, BooleanOperation.Difference)
+        cuboids.append(cuboid)
+    return cuboids
+
+
+scenes = {
+    "Cuboid": cuboidScene,
+    "Box": boxScene,
+    "Prism": prismScene,
+    "Cylinder": cylinderScene,
+    "Cone": coneScene,
+    "Palisade": palisadeScene,
+    "ChangingPalisade": changingPalisadeScene,
+    "Frame3d": frameScene,
+    "BooleanChain": booleanChainScene,
+    "CuboidBooleans": cuboidBooleanScene,
+}
+""" Scene name to scene function. """
+
+
+def resetScene():
+    """Deletes all objects and the meshes they left behind."""
+    import bpy
+
+    boxbuilder.clear_objects()
+    for mesh in list(bpy.data.meshes):
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+
+def blenderVertexCount() -> int:
+    import bpy
+
+    return sum(len(mesh.vertices) for mesh in bpy.data.meshes)
+
+
+def blenderVersion() -> str:
+    """The Blender version or None if bpy is not available."""
+    try:
+        import bpy
+    except ImportError:
+        return None
+    return bpy.app.version_string
+
+
+class Benchmark:
+    """Runs the scenes and collects one result per scene, scale and stage."""
+
+    def __init__(self, geometryOnly=False, batched=False):
+        self.geometryOnly = geometryOnly
+        """ If true, only the geometry buffers are generated and no Blender objects are created. """
+
+        self.batched = batched
+        """ If true, containers are created with BlueprintContainer.createBatched. """
+
+        self.results: list[dict] = []
+
+    def measure(self, scene: str, scale: int, stage: str, function):
+        """Runs the function and records its time and the resulting counts. Returns the result of the function."""
+        start = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - start
+
+        result = {
+            "scene": scene,
+            "scale": scale,
+            "stage": stage,
+            "seconds": seconds,
+            "peakRssBytes": peakRss(),
+        }
+        if stage == "geometry":
+            result["vertices"] = sum(buffers.vertexCount for buffers in value)
+        elif not self.geometryOnly:
+            import bpy
+
+            result["objects"] = len(bpy.data.objects)
+            result["vertices"] = blenderVertexCount()
+        self.results.append(result)
+
+        print(
+            f"{scene:>16} {scale:>6} {stage:>9}: {seconds:9.4f} s "
+            f"{result.get('vertices', '')}"
+        )
+        return value
+
+    def run(self, sceneName: str, scale: int):
+        roots = self.measure(
+            sceneName, scale, "construct", lambda: scenes[sceneName](scale)
+        )
+
+        if self.geometryOnly:
+            # Boolean modifiers only run in Blender, geometry() would leave their work out
+            if any(
+                blueprint.booleanOperations and not blueprint.hasAnalyticBooleans()
+                for root in roots
+                for blueprint in root.walk()
+            ):
+                print(f"{sceneName:>16} {scale:>6}: skipped, needs boolean modifiers")
+                return
+
+            def generateGeometry():
+                buffers = []
+                for root in roots:
+                    for blueprint in root.walk():
+                        blueprintBuffers = blueprint.geometry()
+                        if blueprintBuffers is not None:
+                            buffers.append(blueprintBuffers)
+                return buffers
+
+            self.measure(sceneName, scale, "geometry", generateGeometry)
+            return
+
+        def create():
+            import bpy
+
+            for root in roots:
+                if self.batched and isinstance(root, BlueprintContainer):
+                    root.createBatched()
+                else:
+                    root.create()
+            # Evaluates the modifiers now, so their cost is not charged to the clear stage
+            bpy.context.view_layer.update()
+
+        self.measure(sceneName, scale, "create", create)
+        self.measure(sceneName, scale, "clear", resetScene)
+
+    def write(self, path: str):
+        data = {
+            "metadata": {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "blender": blenderVersion(),
+                "platform": platform.platform(),
+                "module": boxbuilder.__version__,
+                "geometryOnly": self.geometryOnly,
+                "batched": self.batched,
+            },
+            "results": self.results,
+        }
+        with open(path, "w") as file:
+            json.dump(data, file, indent=2)
+
+
+def compare(results: list[dict], baselinePath: str):
+    """Prints the time ratio of every result to the same result in the baseline file."""
+    with open(baselinePath) as file:
+        baseline = {
+            (result["scene"], result["scale"], result["stage"]): result
+            for result in json.load(file)["results"]
+        }
+
+    for result in results:
+        key = (result["scene"], result["scale"], result["stage"])
+        if key not in baseline:
+            continue
+        ratio = result["seconds"] / max(baseline[key]["seconds"], 1e-9)
+        print(f"{key[0]:>16} {key[1]:>6} {key[2]:>9}: {ratio:6.2f}x baseline")
+
+
+def main(arguments: list[str]):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenes", nargs="+", default=list(scenes), choices=scenes)
+    parser.add_argument("--scales", nargs="+", type=int, default=defaultScales)
+    parser.add_argument("--geometry-only", action="store_true")
+    parser.add_argument("--batched", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="An earlier result file to compare with")
+    parser.add_argument(
+        "--trace", help="Also writes the per-stage instrumentation as Chrome trace"
+    )
+    options = parser.parse_args(arguments)
+
+    if options.trace:
+        instrumentation.setLevel(Level.Trace)
+
+    benchmark = Benchmark(options.geometry_only, options.batched)
+    benchmark.results.append(
+        {
+            "scene": "boxbuilder",
+            "scale": 1,
+            "stage": "import",
+            "seconds": importSeconds,
+            "peakRssBytes": peakRss(),
+        }
+    )
+    print(f"Importing boxbuilder took {importSeconds:.4f} s")
+    if not options.geometry_only:
+        resetScene()
+
+    for sceneName in options.scenes:
+        for scale in options.scales:
+            benchmark.run(sceneName, scale)
+
+    benchmark.write(options.output)
+    if options.trace:
+        instrumentation.writeChromeTrace(options.trace)
+        print(instrumentation.summary())
+    if options.compare:
+        compare(benchmark.results, options.compare)
+
+
+if __name__ == "__main__":
+    # Blender passes the script arguments after "--"
+    main(sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else sys.argv[1:])
@@ -2,37 +2,68 @@
 To use this script, fun these VSCode commands from "Blender Development" extension:
 1. Blender: Start (one time at start)
 2. Blender: Run Script (each time to execute script)
+
+Importing this module has no side effects on the scene. The demo scene is built by buildDemoScene(),
+which runs when the file is executed as script.
+NumPy (through meshbuffers) is only imported when geometry is generated, and bpy is optional so that
+worker processes can generate geometry without Blender.
 """
 
-import sys
+from __future__ import annotations
+
+import logging
+import os
+from copy import deepcopy
+from math import sin, cos, pi
+from typing import TYPE_CHECKING
 
 # from varname import nameof # Doesnt work with blender :(
 
-sys.path.append("E:/Coding/BlueprintCreator")
-import bpy
-import bmesh
-from mathutils import Vector
+try:
+    import bpy
+    import bmesh
+except ImportError:
+    # Pure geometry generation, e.g. in worker processes
+    bpy = None
+    bmesh = None
+from mathutils import Matrix, Vector
 from enum import Enum
 
-from Cuboid import *
-from numpy import sin, cos, pi
-import bmesh
+from geometrycache import hashParameters
+import coordinategrid
+from instrumentation import instrumentation
+import buildlogging
+
+if TYPE_CHECKING:
+    # Only for annotations, both are imported where they are used
+    from geometrycache import GeometryCache
+    from meshbuffers import MeshBuffers
+
+__version__ = "0.2.0"
+""" Part of every geometry cache key, so increase it when the generated geometry changes. """
 
 tau = 2 * pi
 
+createLog = buildlogging.getLogger("create")
+collectionLog = buildlogging.getLogger("collection")
+modeLog = buildlogging.getLogger("mode")
+demoLog = buildlogging.getLogger("demo")
+
 
 def setObjectMode():
-    try:
-        bpy.ops.object.mode_set(mode="OBJECT")
-    except RuntimeError as error:
-        print(f"Cannot set object mode: {error}")
+    with instrumentation.stage("Blender", "modeSwitch"):
+        try:
+            bpy.ops.object.mode_set(mode="OBJECT")
+        except RuntimeError as error:
+            modeLog.warning("Cannot set object mode: %s", error)
 
 
 def setEditMode():
-    try:
-        bpy.ops.object.mode_set(mode="EDIT")
-    except RuntimeError as error:
-        print(f"Cannot set edit mode: {error}")
+    with instrumentation.stage("Blender", "modeSwitch"):
+        try:
+            bpy.ops.object.mode_set(mode="EDIT")
+        except RuntimeError as error:
+            modeLog.warning("Cannot set edit mode: %s", error)
 
 
 def getMode():
@@ -47,34 +78,46 @@ def selectAll():
     bpy.ops.object.select_all(action="SELECT")
 
 
-def clear_objects(filter=""):
-    objects = bpy.context.scene.objects
+buildCollectionProperty = "blueprintCollection"
+""" Marks collections created by builds, so clear_objects() can remove them. """
 
-    # Find and delete all objects where filter is in name
-    if filter:
-        objects = [it for it in bpy.context.scene.objects if filter in it.name]
+boxProjectionProperty = "blueprintBoxProjection"
+""" Marks meshes with box-projected UVs with the flattened world matrix they were projected at. """
 
-    setObjectMode()
 
-    deselectAll()
+def removeObjects(objects: list[bpy.types.Object]):
+    """Deletes the objects and the meshes only they used. Deleting with bpy.ops keeps the meshes in bpy.data."""
+    meshes = {
+        object.data.name: object.data
+        for object in objects
+        if isinstance(object.data, bpy.types.Mesh)
+    }
+    bpy.data.batch_remove(objects)
+    bpy.data.batch_remove([mesh for mesh in meshes.values() if mesh.users == 0])
+
 
-    for object in objects:
-        object.hide_set(False)
-        object.select_set(True)
+def clear_objects(filter=""):
+    """Deletes all objects of the scene (where filter is in the name) with their meshes and the build collections left empty."""
+    setObjectMode()
 
-    bpy.ops.object.delete()
+    # Hidden boolean operands are included
+    objects = [it for it in bpy.context.scene.objects if filter in it.name]
+    removeObjects(objects)
+
+    bpy.data.batch_remove(
+        [
+            collection
+            for collection in bpy.data.collections
+            if collection.get(buildCollectionProperty)
+            and not collection.all_objects
+            and not collection.children
+        ]
+    )
 
 
 def removeObject(object):
-    # Deselect all
-    bpy.ops.object.select_all(action="DESELECT")
-    # Select object and delete
-    object.select_set(True)
-    bpy.ops.object.delete()
-
+    removeObjects([object])
 
-# Clear existing blender objects
-clear_objects()
 
 left = Vector((0, -1, 0))
 right = Vector((0, 1, 0))
@@ -132,7 +175,7 @@ def booleanOperation(
     modifier.object = secondObject
 
     if not (firstObject.visible_get() and not firstObject.hide_render):
-        raise Error("Object must be visible")
+        raise RuntimeError("Object must be visible")
 
     # Select the object and apply the modifier
     bpy.context.view_layer.objects.active = firstObject
@@ -140,11 +183,134 @@ def booleanOperation(
 
     # firstObject.modifiers.clear()
 
-    # Recalculate normals (not sure if neccessary)
-    setEditMode()
-    bpy.ops.mesh.select_all(action="SELECT")
-    bpy.ops.mesh.normals_make_consistent(inside=False)
-    setObjectMode()
+    # No normal recalculation: all blueprint geometry is wound outwards, so the result is too
+
+
+nudgedProperty = "gridNudged"
+""" Custom property marking operand meshes that were already nudged. """
+
+
+def nudgeOperand(object: bpy.types.Object, operation: BooleanOperation):
+    """
+    Grows the mesh of the operand of a difference or union and shrinks the one of an intersection by
+    coordinategrid.nudgeSteps grid steps on every side of its bounding box, so its faces are never coplanar
+    with faces of the grid-aligned base. The mesh is scaled about its bounding box centre, the object
+    transform is left unchanged. The same operand and grid always give the same result.
+    """
+    mesh = object.data
+    if (
+        coordinategrid.spacing is None
+        or not isinstance(mesh, bpy.types.Mesh)
+        or not len(mesh.vertices)
+        or mesh.get(nudgedProperty)
+    ):
+        return
+    import numpy as np
+
+    step = coordinategrid.nudgeSteps * coordinategrid.spacing
+    if operation == BooleanOperation.Intersect:
+        step = -step
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", vertices)
+    vertices = vertices.reshape(-1, 3).astype(np.float64)
+    minimum, maximum = vertices.min(axis=0), vertices.max(axis=0)
+    centre = (minimum + maximum) / 2
+    halfSizes = (maximum - minimum) / 2
+
+    # The step is in world units, the mesh is in object units
+    scale = np.abs(np.array(object.scale, dtype=np.float64))
+    localStep = step / np.where(scale > 0, scale, 1)
+    factors = np.ones(3)
+    growable = halfSizes > np.abs(localStep)
+    factors[growable] = (halfSizes[growable] + localStep[growable]) / halfSizes[growable]
+
+    vertices = centre + (vertices - centre) * factors
+    mesh.vertices.foreach_set("co", vertices.astype(np.float32).reshape(-1))
+    mesh.update()
+    mesh[nudgedProperty] = True
+
+
+geometryCache: GeometryCache = None
+""" If set, expensive blueprint geometry is loaded from and stored into this cache. """
+
+
+def enableGeometryCache(directory: str = None, maxBytes=1 << 30) -> GeometryCache:
+    """Enables the on-disk geometry cache. By default it is stored next to the blend file."""
+    global geometryCache
+    from geometrycache import GeometryCache
+
+    if directory is None:
+        if bpy.data.filepath:
+            directory = bpy.path.abspath("//geometry_cache")
+        else:
+            import tempfile
+
+            directory = os.path.join(tempfile.gettempdir(), "BlueprintCreatorCache")
+    geometryCache = GeometryCache(directory, maxBytes)
+    return geometryCache
+
+
+class IncrementalBuild:
+    """
+    Reuses the objects of the previous build whose blueprints did not change or were only moved.
+    Every object created inside the "with" block stores the shape key of its blueprint. Blueprints with
+    the key of an existing object take over that object and move it instead of creating a new one.
+    Objects of the previous build that were not taken over are removed at the end of the block.
+    """
+
+    keyProperty = "blueprintKey"
+    """ The custom object property storing the shape key of the blueprint. """
+
+    def __init__(self):
+        self.reusableObjects: dict[str, list[bpy.types.Object]] = {}
+        """ Objects of the previous build by blueprint key. """
+
+        self.reusedCount = 0
+        self.removedCount = 0
+
+    def __enter__(self):
+        global incrementalBuild
+        for object in bpy.data.objects:
+            key = object.get(IncrementalBuild.keyProperty)
+            if key:
+                self.reusableObjects.setdefault(key, []).append(object)
+        incrementalBuild = self
+        return self
+
+    def take(self, key: str) -> bpy.types.Object:
+        """Returns an unused object of the previous build with the key or None."""
+        objects = self.reusableObjects.get(key)
+        if not objects:
+            return None
+        self.reusedCount += 1
+        return objects.pop()
+
+    def keep(self, object: bpy.types.Object):
+        """Takes over a specific object of the previous build, e.g. the operand of a reused boolean modifier."""
+        key = object.get(IncrementalBuild.keyProperty)
+        objects = self.reusableObjects.get(key, [])
+        if object in objects:
+            objects.remove(object)
+            self.reusedCount += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global incrementalBuild
+        incrementalBuild = None
+
+        # Remove what is left from the previous build
+        for objects in self.reusableObjects.values():
+            for object in objects:
+                data = object.data
+                bpy.data.objects.remove(object, do_unlink=True)
+                if isinstance(data, bpy.types.Mesh) and data.users == 0:
+                    bpy.data.meshes.remove(data)
+                self.removedCount += 1
+        self.reusableObjects.clear()
+
+
+incrementalBuild: IncrementalBuild = None
+""" The active incremental build or None. """
 
 
 class Side(Enum):
@@ -177,6 +343,30 @@ class Blueprint:
         self.isBlenderObjectAddedDuringCreation = False
         """ If true, the _createBlenderObject already adds the blender object to the collection. Neccessary as some creation methods automatically do this. """
 
+        self.booleanOperations: list[tuple[BooleanOperation, Blueprint]] = []
+        """ Boolean operations applied with the other blueprints when creating the object. """
+
+        self.precomputedGeometry: MeshBuffers = None
+        """ Geometry computed in advance (e.g. by a background worker) that is used instead of geometry(). """
+
+        self.isOperand = False
+        """ True if this blueprint is the operand of a boolean operation of another blueprint. """
+
+    nonGeometricAttributes = {
+        "name",
+        "parent",
+        "object",
+        "children",
+        "isBlenderObjectAddedDuringCreation",
+        "booleanOperations",
+        "precomputedGeometry",
+        "isOperand",
+    }
+    """ Attributes that do not influence the geometry and are therefore not part of the parameters. """
+
+    usesPrecomputedGeometry = True
+    """ If false, _createBlenderObject() does not create the object from geometry(), so computing it in advance is wasted. """
+
     def hide(self):
         self.object.hide_set(True)
 
@@ -184,17 +374,16 @@ class Blueprint:
         self.object.hide_set(False)
 
     def remove(self):
-        # Deselect all
-        bpy.ops.object.select_all(action="DESELECT")
-        # Select object and delete
-        self.object.select_set(True)
-        bpy.ops.object.delete()
+        removeObject(self.object)
+        self.object = None
 
     def __repr__(self) -> str:
         return f"{type(self)} {self.name}"
 
-    def write(self, message: str) -> None:
-        print(self.name + ": " + str(message))
+    def write(self, message: str, level=logging.INFO, log=createLog) -> None:
+        """Logs the message with the name of this blueprint. Quiet unless the level of the log is enabled."""
+        if log.isEnabledFor(level):
+            log.log(level, "%s: %s", self.name, message)
 
     def __sub__(self, other):
         return subtract(self, other)
@@ -204,63 +393,293 @@ class Blueprint:
     #     """Round to millimeter or any other value just for better representation."""
     #     return round(value / roundTo) * roundTo
 
+    def addBooleanOperation(self, other: "Blueprint", operation: BooleanOperation):
+        """Adds a boolean operation with the other blueprint that is applied by create()."""
+        self.booleanOperations.append((operation, other))
+        other.isOperand = True
+
+    def hasAnalyticBooleans(self) -> bool:
+        """True if geometry() already contains the boolean operations, so no boolean modifiers are needed."""
+        return False
+
+    def worldOffset(self) -> Vector:
+        """The offset of this blueprint and all its parents, i.e. where its coordinates end up in the scene."""
+        offset = Vector(self.offset)
+        if self.parent:
+            offset += self.parent.worldOffset()
+        return offset
+
+    def applyBooleanOperations(self):
+        """Applies all boolean operations to the object. Operands are created if neccessary and hidden afterwards."""
+        if self.hasAnalyticBooleans():
+            return
+        for operation, other in self.booleanOperations:
+            if not other.object:
+                other.create()
+            with instrumentation.stage(self, "booleans"):
+                nudgeOperand(other.object, operation)
+                booleanOperation(self.object, other.object, operation)
+                other.hide()
+
+    def parameters(self) -> dict:
+        """The attributes that determine the geometry of this blueprint."""
+        return {
+            key: value
+            for key, value in vars(self).items()
+            if key not in Blueprint.nonGeometricAttributes
+        }
+
+    def placement(self) -> Vector:
+        """The location of the created object: the offset plus the translation of the geometry."""
+        return Vector(self.offset)
+
+    def shapeParameters(self) -> dict:
+        """The parameters without the ones that only move the object (see placement())."""
+        parameters = self.parameters()
+        del parameters["offset"]
+        return parameters
+
+    def shapeKey(self) -> str:
+        """Like cacheKey(), but equal for blueprints that only differ by their placement."""
+        # Operands must stay where the modifiers of their base expect them, and hidden.
+        # Without the role, an operand and a visible part with the same shape could swap objects.
+        if getattr(self, "isOperand", False):
+            return hashParameters({"role": "operand", "key": self.cacheKey()})
+        # Boolean results depend on the placement relative to the operands
+        if self.booleanOperations:
+            return self.cacheKey()
+        return hashParameters(
+            {
+                "version": __version__,
+                "type": type(self).__name__,
+                "shape": self.shapeParameters(),
+            }
+        )
+
+    def cacheKey(self) -> str:
+        """A hash of the type, parameters and boolean operations of this blueprint and the module version."""
+        return hashParameters(
+            {
+                "version": __version__,
+                "type": type(self).__name__,
+                "parameters": self.parameters(),
+                "booleanOperations": [
+                    (operation, other.cacheKey())
+                    for operation, other in self.booleanOperations
+                ],
+            }
+        )
+
+    def isCacheable(self) -> bool:
+        """True if creating the geometry is expensive enough to use the geometry cache."""
+        return bool(self.booleanOperations) and not self.hasAnalyticBooleans()
+
     def create(self):
         """Creates a Blender object from this blueprint.
         Also sets the parent if it is available."""
 
+        with instrumentation.stage(self, "create"):
+            key, isBuilt, needsLinking = self._createObject()
+            if needsLinking:
+                self.addToBlenderCollection()
+            self._completeObject(key, isBuilt)
+
+            # Set parent of the blender object if a parent is associated with this blueprint
+            if self.parent:
+                with instrumentation.stage(self, "parenting"):
+                    if not self.parent.object:
+                        self.write("PARENT IS MISSING!", logging.ERROR)
+                    self.object.parent = self.parent.object
+                    createLog.debug("%s: Set parent to %s", self.name, self.parent.name)
+
+    def _createObject(self) -> tuple[str, bool, bool]:
+        """
+        Creates the object without setting its parent. It is reused from the incremental build, loaded
+        from the geometry cache or built, in this order.
+        Returns the cache key (None if not cached), whether the object was built and whether it still
+        has to be added to a collection.
+        """
+        useCache = geometryCache is not None and self.isCacheable()
+        key = self.cacheKey() if useCache else None
+
+        reusedObject = incrementalBuild.take(self.shapeKey()) if incrementalBuild else None
+        if reusedObject:
+            # Unchanged since the previous build except for the placement
+            self.object = reusedObject
+            reusedObject.location = coordinategrid.snapVector(self.placement())
+            self.updateUvs()
+            if getattr(self, "isOperand", False):
+                self.hide()
+            self._reuseOperands()
+            return key, False, False
+
+        if useCache:
+            with instrumentation.stage(self, "cacheLoad"):
+                cachedBuffers = geometryCache.get(key)
+            if cachedBuffers:
+                # The cached mesh already contains the offset and the boolean operations
+                self.object = self._createObjectFromBuffers(
+                    cachedBuffers, self._parentWorldOffset()
+                )
+                return key, False, True
+
         self.object = self._createBlenderObject()
-        self.object.location += Vector(self.offset)
+        self.object.location += coordinategrid.snapVector(self.offset)
+        return key, True, not self.isBlenderObjectAddedDuringCreation
 
-        if not self.isBlenderObjectAddedDuringCreation:
-            self.addToBlenderCollection()
+    def _reuseOperands(self):
+        """
+        Gives the operands the objects that the boolean modifiers of the reused object refer to, and hides
+        them. Objects loaded from the geometry cache have the booleans baked in and need no operands.
+        """
+        modifiers = [
+            modifier
+            for modifier in self.object.modifiers
+            if modifier.type == "BOOLEAN" and modifier.object
+        ]
+        for (_, other), modifier in zip(self.booleanOperations, modifiers):
+            if other.object:
+                modifier.object = other.object
+            else:
+                other.object = modifier.object
+                incrementalBuild.keep(modifier.object)
+            other.hide()
+
+    def _completeObject(self, key: str, isBuilt: bool):
+        """Applies the boolean operations of a built object and names it. The object must be in a collection."""
+        if isBuilt:
+            self.applyBooleanOperations()
+
+            if geometryCache is not None and self.isCacheable():
+                with instrumentation.stage(self, "cacheStore"):
+                    from meshbuffers import MeshBuffers
+
+                    # Cheap safety net instead of recalculating normals in edit mode
+                    buffers = MeshBuffers.fromEvaluatedObject(self.object)
+                    geometryCache.put(key, buffers.orientedOutward())
+
+        if incrementalBuild:
+            self.object[IncrementalBuild.keyProperty] = self.shapeKey()
 
         # Set name
         self.object.name = self.name
 
-        # Set parent of the blender object if a parent is associated with this blueprint
-        if self.parent:
-            if not self.parent.object:
-                self.write("PARENT IS MISSING!")
-            self.object.parent = self.parent.object
-            self.write(f"Set parent to {self.parent.object.name}\n\n")
+    def geometry(self) -> MeshBuffers:
+        """The mesh of this blueprint as NumPy buffers or None if the blueprint has no mesh."""
+        return None
 
     def _createBlenderObject(self) -> bpy.types.Object:
         """
         Private method to create the blender object/node AND add it to the scene, since some geometries like cube are automatically added.
-        By default, creates an empty object.
+        By default, creates a mesh object from geometry() or an empty object if there is no geometry.
         """
+        with instrumentation.stage(self, "geometry") as stage:
+            buffers = self.precomputedGeometry or self.geometry()
+            if buffers is not None:
+                buffers = buffers.snapped()
+                stage.vertices = buffers.vertexCount
+        if buffers is not None:
+            return self._createObjectFromBuffers(buffers)
+
         blenderObject = bpy.data.objects.new(self.name, None)
         blenderObject.name = self.name
         return blenderObject
 
+    def _createObjectFromBuffers(self, buffers: MeshBuffers, uvTranslation=None) -> bpy.types.Object:
+        """
+        Creates a mesh object from buffers, e.g. generated or loaded from the geometry cache.
+        Missing UVs are box-projected where the object ends up: the buffers moved by uvTranslation,
+        by default the offset of this blueprint and its parents.
+        """
+        with instrumentation.stage(self, "meshUpload") as stage:
+            stage.vertices = buffers.vertexCount
+            projection = None
+            if buffers.uvs is None:
+                import numpy as np
+
+                if uvTranslation is None:
+                    uvTranslation = self._parentWorldOffset() + coordinategrid.snapVector(self.offset)
+                buffers = buffers.boxProjected(uvTranslation)
+                projection = np.array(buffers.matrix, dtype=np.float64)
+                projection[:3, 3] += uvTranslation
+            mesh = bpy.data.meshes.new(self.name)
+            buffers.writeToBlenderMesh(mesh)
+            if projection is not None:
+                mesh[boxProjectionProperty] = projection.reshape(-1).tolist()
+
+            blenderObject = bpy.data.objects.new(self.name, mesh)
+            blenderObject.matrix_basis = Matrix(buffers.matrix.tolist())
+        return blenderObject
+
+    def _parentWorldOffset(self) -> Vector:
+        """Where the parents move the created object to, see worldOffset()."""
+        return self.parent.worldOffset() if self.parent else Vector((0, 0, 0))
+
+    def updateUvs(self):
+        """
+        Box-projects the UVs of the created mesh again if the object moved since they were projected, so
+        the textures keep lining up with the neighbouring objects. Other UVs are left alone.
+        """
+        mesh = self.object.data if self.object else None
+        if mesh is None or boxProjectionProperty not in mesh:
+            return
+        import numpy as np
+        from meshbuffers import MeshBuffers
+
+        matrix = np.array(self.object.matrix_basis, dtype=np.float64)
+        matrix[:3, 3] += self._parentWorldOffset()
+        if np.allclose(matrix.reshape(-1), mesh[boxProjectionProperty]):
+            return
+        MeshBuffers.fromBlenderMesh(mesh, matrix).boxProjected().writeUvsToBlenderMesh(mesh)
+        mesh[boxProjectionProperty] = matrix.reshape(-1).tolist()
+
     def addToBlenderCollection(self):
         """Adds the blender object to the blender "SceneCollection/Collection" node."""
         # To retrieve the collection...
         # - Does work:      bpy.context.collection.objects
         # - Does work:      bpy.data.collections.get("Collection")
         # - Does not work:  bpy.context.scene.collection
-        collectionObjects = bpy.context.collection.objects
-        if False:  # self.name in collectionObjects:
-            self.write(f"Cannot add. Already in collection.")
-        else:
-            try:
-                collectionObjects.link(self.object)
-                self.write("Added to collection.")
-            except RuntimeError as error:
-                self.write(f"Could not add. {error}")
+        with instrumentation.stage(self, "collectionLink"):
+            collectionObjects = bpy.context.collection.objects
+            if False:  # self.name in collectionObjects:
+                self.write(f"Cannot add. Already in collection.", log=collectionLog)
+            else:
+                try:
+                    collectionObjects.link(self.object)
+                    collectionLog.debug("%s: Added to collection.", self.name)
+                except RuntimeError as error:
+                    self.write(f"Could not add. {error}", logging.WARNING, collectionLog)
 
     def copy(self, newName, newParent):
         return Blueprint(newName, newParent)
 
+    def walk(self):
+        """Yields this blueprint and all blueprints below it."""
+        yield self
+
+    def createSteps(self):
+        """
+        Creates the objects of this blueprint and all blueprints below it one by one. Each blueprint is
+        yielded right before it is created, so the creation can be interrupted and prepared.
+        """
+        yield self
+        self.create()
+
 
 class BlueprintContainer(Blueprint):
     """Parent of multiple blueprint children."""
 
-    def __init__(self, name="BlueprintContainer", parent=None):
+    def __init__(self, name="BlueprintContainer", parent=None, merge=False):
         super().__init__(name, parent)
 
         self.children: list[Blueprint] = []
 
+        self.isMerged = merge
+        """ If true, the children are not created as objects but welded into a single mesh of this container. """
+
+        self.weldTolerance = 1e-6
+        """ Vertices of merged children closer than this are welded. """
+
     def add_child(self, child: Blueprint):
         """Adds the child to the list so it can be created together."""
         self.children.append(child)
@@ -269,8 +688,77 @@ class BlueprintContainer(Blueprint):
         """Adds the children to the list so they can be created together."""
         self.children.extend(children)
 
+    def walk(self):
+        yield self
+        if self.isMerged:
+            return
+        for child in self.children:
+            yield from child.walk()
+
+    def createSteps(self):
+        yield self
+        Blueprint.create(self)
+        if self.isMerged:
+            return
+        for child in self.children:
+            yield from child.createSteps()
+
+    def parameters(self) -> dict:
+        parameters = super().parameters()
+        # The children determine the geometry of a merged container
+        if self.isMerged:
+            parameters["children"] = self.children
+        return parameters
+
+    def _mergedBlueprints(self):
+        """All blueprints below this container that have a geometry of their own."""
+        for child in self.children:
+            if isinstance(child, BlueprintContainer):
+                yield from child._mergedBlueprints()
+            else:
+                yield child
+
+    def geometry(self) -> MeshBuffers:
+        """If merged, the welded meshes of all blueprints below this container, otherwise None."""
+        if not self.isMerged:
+            return None
+        import numpy as np
+        from meshbuffers import MeshBuffers
+
+        origin = self.worldOffset()
+        parts = []
+        for blueprint in self._mergedBlueprints():
+            if blueprint.booleanOperations and not blueprint.hasAnalyticBooleans():
+                raise ValueError(
+                    f"{blueprint.name} needs boolean modifiers and cannot be merged."
+                )
+            buffers = blueprint.precomputedGeometry or blueprint.geometry()
+            if buffers is None:
+                continue
+            part = buffers.transformed()
+            part.vertices += np.asarray(blueprint.worldOffset() - origin, np.float32)
+            parts.append(part)
+        return MeshBuffers.concatenate(parts).snapped().welded(self.weldTolerance)
+
+    def createBatched(self, collectionName: str = None) -> bpy.types.Collection:
+        """
+        Creates the objects of the whole tree in phases instead of one blueprint after the other: first all
+        objects, then they are linked into a new collection for this container, then all parents are set
+        in one pass and finally the view layer is updated once.
+        Returns the new collection.
+        """
+        with instrumentation.stage(self, "createBatched"):
+            collection = bpy.data.collections.new(collectionName or self.name)
+            collection[buildCollectionProperty] = True
+            bpy.context.scene.collection.children.link(collection)
+            createdCount = createTreesBatched([self], collection)
+        createLog.debug("%s: Created %s objects", self.name, createdCount)
+        return collection
+
     def create(self):
         super().create()
+        if self.isMerged:
+            return
 
         for child in self.children:
             child.create()
@@ -280,6 +768,38 @@ class BlueprintContainer(Blueprint):
             #     print("bla")
 
 
+def createTreesBatched(roots: list[Blueprint], collection: bpy.types.Collection) -> int:
+    """
+    Creates the objects of the trees in phases (see BlueprintContainer.createBatched) and links them into
+    the collection. Parents outside the trees are not set. Returns the number of created objects.
+    """
+    created = [
+        (blueprint, *blueprint._createObject())
+        for root in roots
+        for blueprint in root.walk()
+    ]
+
+    with instrumentation.stage("createTreesBatched", "collectionLink"):
+        collectionObjects = collection.objects
+        for blueprint, _, _, needsLinking in created:
+            if needsLinking:
+                collectionObjects.link(blueprint.object)
+
+    # Children keep their coordinates relative to the parent, as in create()
+    with instrumentation.stage("createTreesBatched", "parenting"):
+        identity = Matrix.Identity(4)
+        for blueprint, _, _, _ in created:
+            if blueprint.parent and blueprint.parent.object:
+                blueprint.object.parent = blueprint.parent.object
+                blueprint.object.matrix_parent_inverse = identity
+
+    for blueprint, key, isBuilt, _ in created:
+        blueprint._completeObject(key, isBuilt)
+
+    bpy.context.view_layer.update()
+    return len(created)
+
+
 class LastAddedBlenderObject:
     """
     Helping class for working with the last added Blender object defined by bpy.context.object.
@@ -308,7 +828,7 @@ class PrimitiveBlueprint(Blueprint):
         self.isBlenderObjectAddedDuringCreation = True
 
 
-class ConeBlueprint(PrimitiveBlueprint):
+class ConeBlueprint(Blueprint):
 
     def __init__(
         self,
@@ -326,17 +846,20 @@ class ConeBlueprint(PrimitiveBlueprint):
         self.radius2 = radius2
         self.resolution = resolution
 
-    def _createBlenderObject(self) -> bpy.types.Object:
-        bpy.ops.mesh.primitive_cone_add(
-            radius1=self.radius1,
-            radius2=self.radius2,
-            depth=self.height,  # Depth is height...
-            vertices=self.resolution,
+    def geometry(self) -> MeshBuffers:
+        """A cone centered like bpy.ops.mesh.primitive_cone_add with radius1 at the bottom."""
+        from meshbuffers import MeshBuffers
+
+        return MeshBuffers.frustum(
+            self.resolution,
+            self.radius1,
+            self.radius2,
+            -self.height / 2,
+            self.height / 2,
         )
-        return bpy.context.object
 
 
-class CylinderBlueprint(PrimitiveBlueprint):
+class CylinderBlueprint(Blueprint):
 
     def __init__(
         self,
@@ -352,17 +875,20 @@ class CylinderBlueprint(PrimitiveBlueprint):
         self.radius = radius
         self.resolution = resolution
 
-    def _createBlenderObject(self) -> bpy.types.Object:
-        bpy.ops.mesh.primitive_cylinder_add(
-            radius=self.radius,
-            depth=self.height,  # Depth is height...
-            vertices=self.resolution,
-            # scale=(self.radius, self.radius, self.height),
+    def geometry(self) -> MeshBuffers:
+        """A cylinder centered like bpy.ops.mesh.primitive_cylinder_add."""
+        from meshbuffers import MeshBuffers
+
+        return MeshBuffers.frustum(
+            self.resolution,
+            self.radius,
+            self.radius,
+            -self.height / 2,
+            self.height / 2,
         )
-        return bpy.context.object
 
 
-class CuboidBlueprint(PrimitiveBlueprint):
+class CuboidBlueprint(Blueprint):
     """Use this to specify a cuboid that will be rendered."""
 
     def __init__(
@@ -385,12 +911,21 @@ class CuboidBlueprint(PrimitiveBlueprint):
         self.front = front
 
     def move(self, x=0, y=0, z=0):
-        self.left += y
-        self.right += y
-        self.back += x
-        self.front += x
-        self.bot += z
-        self.top += z
+        """Moves the cuboid. A created object is moved along without rebuilding its mesh."""
+        # Repeated moves would accumulate rounding errors without the grid
+        self.left = coordinategrid.snap(self.left + y)
+        self.right = coordinategrid.snap(self.right + y)
+        self.back = coordinategrid.snap(self.back + x)
+        self.front = coordinategrid.snap(self.front + x)
+        self.bot = coordinategrid.snap(self.bot + z)
+        self.top = coordinategrid.snap(self.top + z)
+
+        if self.object:
+            if self.hasAnalyticBooleans():
+                self.write(
+                    "Moved after creation, the operands are moved along", logging.WARNING
+                )
+            self.object.location += Vector((x, y, z))
 
     @property
     def height(self):
@@ -513,29 +1048,66 @@ class CuboidBlueprint(PrimitiveBlueprint):
 
     # Functions
 
-    def _createBlenderObject(self) -> bpy.types.Object:
-        """Adds a cube node."""
-        dimensions = self.frontrighttop - self.backleftbot
-        location = self.backleftbot + dimensions / 2
-
-        bpy.ops.mesh.primitive_cube_add(
-            size=1,
-            enter_editmode=False,
-            align="WORLD",
-            location=location,
-            scale=dimensions,
+    def geometry(self) -> MeshBuffers:
+        """
+        A cube mesh with its origin in the center, like bpy.ops.mesh.primitive_cube_add.
+        Boolean operations with other cuboids are computed exactly (see boxcsg) instead of by modifiers.
+        """
+        from meshbuffers import MeshBuffers
+
+        if not self.hasAnalyticBooleans():
+            return MeshBuffers.cuboid(self.backleftbot, self.frontrighttop)
+
+        from boxcsg import BoxSet
+
+        # On the coordinate grid, coplanar faces of the operands are exactly coplanar
+        snapVector = coordinategrid.snapVector
+        shape = BoxSet.fromBounds(snapVector(self.backleftbot), snapVector(self.frontrighttop))
+        worldOffset = self.worldOffset()
+        for operation, other in self.booleanOperations:
+            # Move the other cuboid into the coordinates of this one
+            shift = other.worldOffset() - worldOffset
+            otherShape = BoxSet.fromBounds(
+                snapVector(other.backleftbot + shift), snapVector(other.frontrighttop + shift)
+            )
+            shape = shape.apply(operation.name, otherShape)
+        return shape.toMeshBuffers()
+
+    def placement(self) -> Vector:
+        # The mesh is centered, see MeshBuffers.cuboid()
+        if self.hasAnalyticBooleans():
+            return Vector(self.offset)
+        return Vector(self.offset) + (self.backleftbot + self.frontrighttop) / 2
+
+    def shapeParameters(self) -> dict:
+        if self.booleanOperations:
+            return super().shapeParameters()
+        parameters = {
+            name: value
+            for name, value in super().shapeParameters().items()
+            if name not in ("left", "right", "bot", "top", "back", "front")
+        }
+        parameters["size"] = (self.depth, self.width, self.height)
+        return parameters
+
+    def hasAnalyticBooleans(self) -> bool:
+        return bool(self.booleanOperations) and all(
+            isinstance(other, CuboidBlueprint) and not other.booleanOperations
+            for _, other in self.booleanOperations
         )
 
-        return bpy.context.object
-
     def __str__(self):
         return f"Cube: {self.left} to {self.right}, {self.bot} to {self.top}, {self.back} to {self.front}"
 
     def __repr__(self):
         return self.__str__()
 
-    def copy(self, name):
-        cuboid = deepcopy(self)
+    def copy(self, name, parent: Blueprint = None):
+        """Copies the cuboid. The copy gets the given parent or the same parent if none is given."""
+        # Share the parent instead of copying the whole parent tree and do not copy the Blender object
+        cuboid = deepcopy(
+            self, {id(self.parent): parent or self.parent, id(self.object): None}
+        )
         cuboid.name = name
         return cuboid
 
@@ -600,7 +1172,7 @@ class BoxBlueprint(BlueprintContainer):
         leftpart = CuboidBlueprint(self, "leftpart")
         leftpart.backleftbot = backleftbot
         leftpart.width = thickness
-        leftpart.front = depth
+        leftpart.depth = depth
         leftpart.height = height
         if not leftRightHaveMaxHeight:
             leftpart.bot += thickness
@@ -735,7 +1307,7 @@ class PolygonBlueprint(Blueprint):
         vertices=[(1, 1, 0), (-1, 1, 0), (-1, -1, 0), (1, -1, 0)],
         offset=Vector((0, 0, 0)),
     ):
-        """Anti-clockwise order."""
+        """Anti-clockwise order, seen from the side the polygon faces."""
         super().__init__(name, parent, offset)
 
         # Vertices coordinates
@@ -745,30 +1317,41 @@ class PolygonBlueprint(Blueprint):
         self.edges = [(i, (i + 1) % (vertexCount)) for i in range(vertexCount)]
         self.faces = [tuple(range(vertexCount))]
 
-    def _createBlenderObject(self) -> bpy.types.Object:
-        """Creates a QuadMesh."""
+    def geometry(self) -> MeshBuffers:
+        from meshbuffers import MeshBuffers
+
+        return MeshBuffers.fromPolygons(self.vertices, self.faces)
 
-        # Create mesh
-        mesh = bpy.data.meshes.new("QuadMesh")
-        mesh.from_pydata(self.vertices, self.edges, self.faces)
+    def placement(self) -> Vector:
+        return bpy.context.scene.cursor.location + Vector(self.offset)
 
-        # Create object with mesh
-        blenderObject = bpy.data.objects.new(self.name, mesh)
+    def _createBlenderObject(self) -> bpy.types.Object:
+        """Creates a QuadMesh."""
+        blenderObject = super()._createBlenderObject()
+        blenderObject.data.name = "QuadMesh"
 
         # Set location
         blenderObject.location = bpy.context.scene.cursor.location
 
-        # Link to collection. This is neccessary for all objects?
-        # addToScene(self)
+        return blenderObject
 
-        # Update mesh geometry
-        mesh.update()
 
-        return blenderObject
+def polygonNormal(points: list[Vector]) -> Vector:
+    """
+    The normal of a polygon by Newell's method, scaled by twice its area.
+    It points to the side from which the points are ordered anti-clockwise.
+    """
+    normal = Vector((0, 0, 0))
+    for point, nextPoint in zip(points, points[1:] + points[:1]):
+        normal += Vector(point).cross(Vector(nextPoint))
+    return normal
 
 
 def enumerate_two_elements(list):
-    """Enumerates an iterable, yielding pairs of consecutive elements."""
+    """Enumerates an iterable, yielding pairs of consecutive elements.
+
+    [1, 2, 3] yields (1, 2) and (2, 3).
+    """
     item = iter(list)
     previous = next(item)
     for item in item:
@@ -776,12 +1359,6 @@ def enumerate_two_elements(list):
         previous = item
 
 
-# Example usage
-my_list = [1, 2, 3, 4, 5]
-for item1, item2 in enumerate_two_elements(my_list):
-    print(f"Item1: {item1}, Item2: {item2}")
-
-
 class Palisade(BlueprintContainer):
     """Specifies quads by base points and an offset by whom they are extruded."""
 
@@ -797,8 +1374,10 @@ class Palisade(BlueprintContainer):
         ],
         offset=Vector((0, 0, 1)),
         closeLoop=True,
+        facesOutward=True,
+        merge=False,
     ):
-        super().__init__(name, parent)
+        super().__init__(name, parent, merge)
 
         self.basePoints = basePoints
         """ The points that determine the bottom of the palisade polygon. """
@@ -806,22 +1385,30 @@ class Palisade(BlueprintContainer):
         self.closeLoop = closeLoop
         """ If true, the starting point will be appended to the end. This creates a closed list of points. """
 
+        self.facesOutward = facesOutward
+        """ If true, the quads face away from the inside of the base polygon, otherwise towards it. """
+
         self.halfOffsettedPoints = [point + 0.5 * offset for point in basePoints]
 
         offsettedPoints = [point + offset for point in basePoints]
         self.offsettedPoints = offsettedPoints
 
-        # May add start point to end
+        # May add start point to end (without changing the given list, which may belong to a frame)
         if closeLoop:
-            basePoints.append(basePoints[0])
-            offsettedPoints.append(offsettedPoints[0])
+            basePoints = basePoints + basePoints[:1]
+            offsettedPoints = offsettedPoints + offsettedPoints[:1]
+
+        # The quads face outwards if the base points are anti-clockwise seen along the offset
+        isAntiClockwise = polygonNormal(self.basePoints).dot(offset) >= 0
+        isFlipped = isAntiClockwise != facesOutward
 
         for (point, nextPoint), (offsetted, nextOffsetted) in zip(
             enumerate_two_elements(basePoints), enumerate_two_elements(offsettedPoints)
         ):
-            quad = PolygonBlueprint(
-                self, "Quad", [point, nextPoint, nextOffsetted, offsetted]
-            )
+            vertices = [point, nextPoint, nextOffsetted, offsetted]
+            if isFlipped:
+                vertices.reverse()
+            quad = PolygonBlueprint(self, "Quad", vertices)
             self.add_child(quad)
 
 
@@ -845,28 +1432,41 @@ class ChangingPalisadeBlueprint(BlueprintContainer):
             Vector((0, 1, 1)),
         ],
         closeLoop=True,
+        facesOutward=True,
+        merge=False,
     ):
-        super().__init__(name, parent)
+        super().__init__(name, parent, merge)
 
         self.botPoints = botPoints
         """ The points that determine the bottom of the palisade polygon. """
         self.topPoints = topPoints
-        """ The points that determine the bottom of the palisade polygon. """
+        """ The points that determine the top of the palisade polygon. """
 
         self.closeLoop = closeLoop
         """ If true, the starting point will be appended to the end. This creates a closed list of points. """
 
+        self.facesOutward = facesOutward
+        """ If true, the quads face away from the inside of the bottom polygon, otherwise towards it. """
+
         # May add start point to end
         if closeLoop:
-            botPoints.append(botPoints[0])
-            topPoints.append(topPoints[0])
+            botPoints = botPoints + botPoints[:1]
+            topPoints = topPoints + topPoints[:1]
+
+        # Like Palisade, with the offset between the centers of bottom and top
+        direction = sum(self.topPoints, Vector()) / len(self.topPoints) - sum(
+            self.botPoints, Vector()
+        ) / len(self.botPoints)
+        isAntiClockwise = polygonNormal(self.botPoints).dot(direction) >= 0
+        isFlipped = isAntiClockwise != facesOutward
 
         for (point, nextPoint), (offsetted, nextOffsetted) in zip(
             enumerate_two_elements(botPoints), enumerate_two_elements(topPoints)
         ):
-            quad = PolygonBlueprint(
-                self, "Quad", [point, nextPoint, nextOffsetted, offsetted]
-            )
+            vertices = [point, nextPoint, nextOffsetted, offsetted]
+            if isFlipped:
+                vertices.reverse()
+            quad = PolygonBlueprint(self, "Quad", vertices)
             self.add_child(quad)
 
 
@@ -886,10 +1486,12 @@ class Frame3dBlueprint(BlueprintContainer):
         rightDirection=right,
         frontDirection=forward,
         depth=0.2,
+        merge=False,
     ):
-        super().__init__(name, parent)
+        """With merge, the whole frame is a single welded mesh."""
+        super().__init__(name, parent, merge)
 
-        def createFrame(frameName, botLeftPosition):
+        def createFrame(frameName, botLeftPosition, normal):
             """Creates the frame for the back or the front."""
             return Frame(
                 frameName,
@@ -900,6 +1502,7 @@ class Frame3dBlueprint(BlueprintContainer):
                 frameWidth,
                 upDirection,
                 rightDirection,
+                normal,
             )
 
         self.width = width
@@ -907,14 +1510,21 @@ class Frame3dBlueprint(BlueprintContainer):
         self.depth = depth
         self.frameThickness = frameWidth
 
-        self.backFrame = createFrame("BackFrame", botLeft)
-        self.frontFrame = createFrame("FrontFrame", botLeft + frontDirection * depth)
+        # All quads face away from the solid frame, the inner palisade towards the opening
+        self.backFrame = createFrame("BackFrame", botLeft, -frontDirection)
+        self.frontFrame = createFrame(
+            "FrontFrame", botLeft + frontDirection * depth, frontDirection
+        )
 
         self.outerPalisade = Palisade(
-            "OuterPalisade", self, self.backFrame.outerPoints, Vector((depth, 0, 0))
+            "OuterPalisade", self, self.backFrame.outerPoints, frontDirection * depth
         )
         self.innerPalisade = Palisade(
-            "InnerPalisade", self, self.backFrame.innerPoints, Vector((depth, 0, 0))
+            "InnerPalisade",
+            self,
+            self.backFrame.innerPoints,
+            frontDirection * depth,
+            facesOutward=False,
         )
         self.add_children(
             [self.frontFrame, self.backFrame, self.outerPalisade, self.innerPalisade]
@@ -944,11 +1554,14 @@ class Frame(BlueprintContainer):
         frameThickness=0.1,
         upDirection=up,
         rightDirection=right,
+        normal: Vector = None,
+        merge=False,
     ):
-        super().__init__(name, parent)
+        """By default, the quads face along rightDirection x upDirection, otherwise along the normal."""
+        super().__init__(name, parent, merge)
 
         self.botLeft = Vector(botLeft)
-        self.botRight = botLeft + right * width
+        self.botRight = botLeft + rightDirection * width
         self.topRight = self.botRight + upDirection * height
         self.topLeft = botLeft + upDirection * height
         self.botLeftInner = botLeft + frameThickness * (upDirection + rightDirection)
@@ -996,6 +1609,9 @@ class Frame(BlueprintContainer):
             self.topQuad,
             self.leftQuad,
         ]
+        if normal is not None and rightDirection.cross(upDirection).dot(normal) < 0:
+            for quad in self.quads:
+                quad.vertices.reverse()
         self.add_children(self.quads)
 
 
@@ -1031,13 +1647,18 @@ def extrudeOld(object, length=2):
     bpy.ops.mesh.select_all(action="SELECT")
     bpy.ops.mesh.flip_normals()
 
-    # Recalculate UV
-    bpy.ops.mesh.select_all(action="SELECT")
-    bpy.ops.uv.smart_project()
-
     # Switch back to object mode
     setObjectMode()
 
+    # Box-projected UVs instead of the slow smart_project operator
+    import numpy as np
+    from meshbuffers import MeshBuffers
+
+    buffers = MeshBuffers.fromBlenderMesh(
+        object.data, np.array(object.matrix_world, dtype=np.float32)
+    )
+    buffers.boxProjected().writeUvsToBlenderMesh(object.data)
+
     # Origin to center
     bpy.ops.object.origin_set(type="ORIGIN_GEOMETRY", center="BOUNDS")
 
@@ -1114,71 +1735,73 @@ class PrismBlueprint(Blueprint):
         botRadius=1,
         topRadius=0.8,
     ):
-        super().__init__(name, parent)
+        """A regular prism standing on the offset. The top may be smaller or bigger than the bottom."""
+        super().__init__(name, parent, offset)
+        self.sideCount = sideCount
+        self.height = height
+        self.botRadius = botRadius
+        self.topRadius = topRadius
 
-        botVertices = calculateRegularPolygonPoints(sideCount, botRadius, offset)
-        topVertices = calculateRegularPolygonPoints(
-            sideCount, topRadius, Vector((0, 0, height)) + offset
-        )
+    def geometry(self) -> MeshBuffers:
+        from meshbuffers import MeshBuffers
 
-        # The top will be the object the bot and walls are merged to
-        self.top = PolygonBlueprint(None, name, topVertices)
-        self.bot = PolygonBlueprint(None, name + ".Bot", botVertices)
-        self.walls = ChangingPalisadeBlueprint(
-            name + ".Walls", None, topVertices, botVertices
+        return MeshBuffers.frustum(
+            self.sideCount, self.botRadius, self.topRadius, 0, self.height
         )
 
-    def create(self):
-        self.top.create()
-        self.bot.create()
-        self.walls.create()
-
-        # Join all objects
-        join(self.top.object, self.bot.object)
-        for wall in self.walls.children:
-            join(self.top.object, wall.object)
-
-        removeObject(self.walls.object)
-
-        self.object = self.top.object
-        # self.object.location += Vector(self.offset)
-
-
-hexPrism = PrismBlueprint(
-    None,
-    "HexPrism",
-    sideCount=6,
-    height=1.0001,
-    offset=Vector((0, 0, 0.0)),
-    topRadius=0.9,
-    botRadius=0.8,
-)
-hexPrism.create()
-
-cylinder = CylinderBlueprint(
-    None, "Cylinder", height=2, radius=1, offset=Vector((0, 0, 0))
-)
-cylinder.create()
-
-cone = ConeBlueprint(
-    None, "Cone", radius1=0, radius2=1, height=1.0, offset=Vector((0, 0, 0.5))
-)
-cone.create()
-
-subtract(cylinder.object, cone.object)
-cone.hide()
-
-# Remove hexPrism from cylinder
-subtract(cylinder.object, hexPrism.object)
-hexPrism.hide()
-
-implant = PrismBlueprint(
-    None,
-    "HexPrism",
-    sideCount=6,
-    height=1.0001,
-    offset=Vector((0, 0, 2.0)),
-    topRadius=0.9,
-    botRadius=0.8,
-)
-implant.create()
+
+def buildDemoScene(clear=True):
+    """Builds a cylinder with a cone and a hex prism cut out of it and a hex prism implant.
+    With clear, all existing objects are deleted first."""
+    # Clear existing blender objects
+    if clear:
+        clear_objects()
+
+    enableGeometryCache()
+
+    hexPrism = PrismBlueprint(
+        None,
+        "HexPrism",
+        sideCount=6,
+        height=1.0001,
+        offset=Vector((0, 0, 0.0)),
+        topRadius=0.9,
+        botRadius=0.8,
+    )
+
+    cylinder = CylinderBlueprint(
+        None, "Cylinder", height=2, radius=1, offset=Vector((0, 0, 0))
+    )
+
+    cone = ConeBlueprint(
+        None, "Cone", radius1=0, radius2=1, height=1.0, offset=Vector((0, 0, 0.5))
+    )
+
+    # Remove cone and hexPrism from cylinder. The operands are created and hidden on demand,
+    # so they are skipped entirely if the result is in the geometry cache.
+    cylinder.addBooleanOperation(cone, BooleanOperation.Difference)
+    cylinder.addBooleanOperation(hexPrism, BooleanOperation.Difference)
+    cylinder.create()
+
+    from meshvalidation import validateObject
+
+    report = validateObject(cylinder.object)
+    if not report.isValid:
+        demoLog.warning("Boolean result of %s is invalid: %s", cylinder.name, report.summary())
+
+    implant = PrismBlueprint(
+        None,
+        "HexPrism",
+        sideCount=6,
+        height=1.0001,
+        offset=Vector((0, 0, 2.0)),
+        topRadius=0.9,
+        botRadius=0.8,
+    )
+    implant.create()
+
+    buildlogging.flushSummary()
+
+
+if __name__ == "__main__":
+    buildDemoScene()
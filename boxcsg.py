@@ -0,0 +1,159 @@
+"""
+Exact boolean operations between axis-aligned boxes without Blender's boolean modifier.
+
+Shapes are sets of disjoint boxes, each stored as (minX, minY, minZ, maxX, maxY, maxZ). Only when a mesh
+is needed, the boxes are rasterized onto the grid of their own coordinates, which creates a welded,
+watertight quad mesh without sliver triangles or T-junctions.
+"""
+
+import numpy as np
+
+
+class BoxSet:
+    """A shape made of disjoint axis-aligned boxes."""
+
+    def __init__(self, boxes=None):
+        self.boxes = (
+            np.empty((0, 6)) if boxes is None else np.asarray(boxes, dtype=np.float64)
+        )
+        """ (N, 6) array of minimum and maximum corners. """
+
+    @staticmethod
+    def fromBounds(minimum, maximum) -> "BoxSet":
+        """A single box. The corners may be given in any order."""
+        minimum, maximum = np.asarray(minimum), np.asarray(maximum)
+        return BoxSet(
+            [np.concatenate((np.minimum(minimum, maximum), np.maximum(minimum, maximum)))]
+        )
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    @property
+    def volume(self) -> float:
+        # The boxes are disjoint, so their volumes add up
+        return float(np.prod(self.boxes[:, 3:] - self.boxes[:, :3], axis=1).sum())
+
+    # Operations
+
+    def difference(self, other: "BoxSet") -> "BoxSet":
+        """Removes the other shape from this shape."""
+        boxes = self.boxes
+        for cutter in other.boxes:
+            boxes = BoxSet._subtractBox(boxes, cutter)
+        return BoxSet(boxes)
+
+    def union(self, other: "BoxSet") -> "BoxSet":
+        """Adds the parts of the other shape that are not already part of this shape."""
+        return BoxSet(np.concatenate((self.boxes, other.difference(self).boxes)))
+
+    def intersection(self, other: "BoxSet") -> "BoxSet":
+        """Keeps the parts of this shape that are part of the other shape too."""
+        # Pairwise intersections of two disjoint sets are disjoint
+        minimum = np.maximum(self.boxes[:, None, :3], other.boxes[None, :, :3])
+        maximum = np.minimum(self.boxes[:, None, 3:], other.boxes[None, :, 3:])
+        boxes = np.concatenate((minimum, maximum), axis=2).reshape(-1, 6)
+        return BoxSet(boxes[np.all(boxes[:, :3] < boxes[:, 3:], axis=1)])
+
+    def apply(self, operationName: str, other: "BoxSet") -> "BoxSet":
+        """Applies the operation given by the name of a BooleanOperation (Difference, Intersect or Union)."""
+        if operationName == "Difference":
+            return self.difference(other)
+        if operationName == "Intersect":
+            return self.intersection(other)
+        if operationName == "Union":
+            return self.union(other)
+        raise ValueError(f"Unknown boolean operation {operationName}")
+
+    @staticmethod
+    def _subtractBox(boxes, cutter):
+        """Splits every box touched by the cutter into the up to 6 boxes around the cutter."""
+        overlapping = np.all(boxes[:, :3] < cutter[3:], axis=1) & np.all(
+            boxes[:, 3:] > cutter[:3], axis=1
+        )
+        pieces = [boxes[~overlapping]]
+        remaining = boxes[overlapping].copy()
+
+        # Cut away the slabs below and above the cutter, one axis after the other
+        for axis in range(3):
+            below = remaining[:, axis] < cutter[axis]
+            slabs = remaining[below].copy()
+            slabs[:, 3 + axis] = cutter[axis]
+            pieces.append(slabs)
+
+            above = remaining[:, 3 + axis] > cutter[3 + axis]
+            slabs = remaining[above].copy()
+            slabs[:, axis] = cutter[3 + axis]
+            pieces.append(slabs)
+
+            # Continue with the part inside the cutter range of this axis
+            remaining[:, axis] = np.maximum(remaining[:, axis], cutter[axis])
+            remaining[:, 3 + axis] = np.minimum(remaining[:, 3 + axis], cutter[3 + axis])
+
+        return np.concatenate(pieces)
+
+    # Meshing
+
+    def toMeshBuffers(self):
+        """
+        Creates a welded quad mesh with outward faces. Every face lies on the grid of all box coordinates,
+        so neighbouring faces always share their vertices.
+        """
+        from meshbuffers import MeshBuffers
+
+        if not len(self.boxes):
+            return MeshBuffers(
+                np.empty((0, 3), np.float32),
+                np.empty(0, np.int32),
+                np.empty(0, np.int32),
+            )
+
+        axes = [np.unique(self.boxes[:, [axis, 3 + axis]]) for axis in range(3)]
+        nodeCounts = np.array([len(coordinates) for coordinates in axes])
+
+        # Occupancy of the grid cells, padded with an empty layer on every side
+        occupied = np.zeros(tuple(nodeCounts + 1), dtype=bool)
+        indices = np.stack(
+            [
+                np.searchsorted(axes[axis], self.boxes[:, [axis, 3 + axis]])
+                for axis in range(3)
+            ],
+            axis=1,
+        )
+        for (x0, x1), (y0, y1), (z0, z1) in indices:
+            occupied[x0 + 1 : x1 + 1, y0 + 1 : y1 + 1, z0 + 1 : z1 + 1] = True
+
+        quads = []
+        for axis in range(3):
+            # A face lies between two neighbouring cells with different occupancy
+            before = np.take(occupied, range(0, nodeCounts[axis]), axis=axis)
+            after = np.take(occupied, range(1, nodeCounts[axis] + 1), axis=axis)
+            for solidBefore in (True, False):
+                faces = np.argwhere((before == solidBefore) & (after != solidBefore))
+                if not len(faces):
+                    continue
+                # Cell indices of the other axes are shifted by the padding
+                other1, other2 = (axis + 1) % 3, (axis + 2) % 3
+                faces[:, other1] -= 1
+                faces[:, other2] -= 1
+                step1 = np.eye(3, dtype=np.int64)[other1]
+                step2 = np.eye(3, dtype=np.int64)[other2]
+                corners = [faces, faces + step1, faces + step1 + step2, faces + step2]
+                if not solidBefore:
+                    corners.reverse()
+                quads.append(np.stack(corners, axis=1))
+
+        quads = np.concatenate(quads)
+        nodeIds = np.ravel_multi_index(quads.reshape(-1, 3).T, tuple(nodeCounts))
+        usedNodes, loops = np.unique(nodeIds, return_inverse=True)
+        nodes = np.unravel_index(usedNodes, tuple(nodeCounts))
+        vertices = np.column_stack([axes[axis][nodes[axis]] for axis in range(3)])
+
+        return MeshBuffers(
+            vertices.astype(np.float32),
+            loops.astype(np.int32),
+            np.full(len(quads), 4, dtype=np.int32),
+        )
+
+    def __repr__(self) -> str:
+        return f"BoxSet: {len(self.boxes)} boxes"
@@ -0,0 +1,250 @@
+"""
+Scene-wide triangle budget: chooses the resolutions of all cylinders and cones of a tree together.
+
+    plan = planBudget(root, triangleBudget=2_000_000, viewpoint=(0, -20, 5))
+    print(plan.summary())
+    plan.apply()
+    root.createBatched()
+
+Each curved blueprint gets a resolution proportional to its weight, by default its radius, or with a
+viewpoint its radius divided by its distance (its screen coverage). One scale factor for all weights is
+found by bisection, so that the whole tree stays within the budget. Cylinders and cones are counted from
+their parameters, all other meshes from their geometry(). No Blender objects are created.
+"""
+
+import numpy as np
+
+import buildlogging
+from boxbuilder import (
+    Blueprint,
+    BlueprintContainer,
+    ConeBlueprint,
+    CuboidBlueprint,
+    CylinderBlueprint,
+)
+
+log = buildlogging.getLogger("budget")
+
+bytesPerVertex = 12 + 12
+""" Position in MeshBuffers and in the Blender mesh. """
+
+bytesPerLoop = 4 + 8 + 4 + 4 + 8
+""" Vertex index and UV in MeshBuffers, vertex index, edge index and UV in the Blender mesh. """
+
+bytesPerFace = 4 + 4
+""" Face size in MeshBuffers, loop start in the Blender mesh. """
+
+bytesPerEdge = 8
+""" Blender edges, about one per two loops. """
+
+
+class MeshCounts:
+    """The number of vertices, loops, faces and triangles of one or more meshes."""
+
+    def __init__(self, vertices=0, loops=0, faces=0, triangles=0):
+        self.vertices = vertices
+        self.loops = loops
+        self.faces = faces
+        self.triangles = triangles
+
+    def __add__(self, other: "MeshCounts") -> "MeshCounts":
+        return MeshCounts(
+            self.vertices + other.vertices,
+            self.loops + other.loops,
+            self.faces + other.faces,
+            self.triangles + other.triangles,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """The estimated memory of the generated buffers and the Blender meshes."""
+        return (
+            self.vertices * bytesPerVertex
+            + self.loops * bytesPerLoop
+            + self.loops * bytesPerEdge // 2
+            + self.faces * bytesPerFace
+        )
+
+
+def frustumCounts(sideCounts, hasBot, hasTop):
+    """
+    The counts of MeshBuffers.frustum() per (N,) side counts, which may be float arrays. hasBot and hasTop
+    tell if the radii are not 0, i.e. if there is a ring and a cap instead of an apex.
+    Returns (vertices, loops, faces, triangles) arrays.
+    """
+    sideCounts = np.asarray(sideCounts, dtype=np.float64)
+    ringCount = np.asarray(hasBot, dtype=np.float64) + np.asarray(hasTop, dtype=np.float64)
+    wallCorners = 2 + ringCount
+    vertices = ringCount * sideCounts + (2 - ringCount)
+    loops = sideCounts * wallCorners + ringCount * sideCounts
+    faces = sideCounts + ringCount
+    triangles = sideCounts * (wallCorners - 2) + ringCount * (sideCounts - 2)
+    return vertices, loops, faces, triangles
+
+
+def meshCounts(blueprint: Blueprint) -> MeshCounts:
+    """The counts of the mesh generated for a blueprint. Boolean operations are not taken into account."""
+    if type(blueprint) is CuboidBlueprint and not blueprint.booleanOperations:
+        return MeshCounts(8, 24, 6, 12)
+    buffers = blueprint.precomputedGeometry or blueprint.geometry()
+    if buffers is None:
+        return MeshCounts()
+    return MeshCounts(
+        buffers.vertexCount,
+        buffers.loopCount,
+        buffers.faceCount,
+        int(np.sum(buffers.faceSizes, dtype=np.int64)) - 2 * buffers.faceCount,
+    )
+
+
+def meshBlueprints(root: Blueprint) -> list[Blueprint]:
+    """
+    All blueprints below the root that create a mesh, including boolean operands outside the tree.
+    Merged containers are one mesh, their children are not created on their own.
+    """
+    found = []
+    seenIds = set()
+    pending = [root]
+    while pending:
+        blueprint = pending.pop()
+        if id(blueprint) in seenIds:
+            continue
+        seenIds.add(id(blueprint))
+        if isinstance(blueprint, BlueprintContainer) and not blueprint.isMerged:
+            pending.extend(reversed(blueprint.children))
+        else:
+            found.append(blueprint)
+        pending.extend(other for _, other in blueprint.booleanOperations)
+    return found
+
+
+class BudgetPlan:
+    """The resolutions chosen for the curved blueprints of a tree and the resulting counts."""
+
+    def __init__(
+        self,
+        blueprints: list[Blueprint],
+        resolutions: np.ndarray,
+        fixedCounts: MeshCounts,
+        curvedCounts: MeshCounts,
+        triangleBudget: int,
+    ):
+        self.blueprints = blueprints
+        """ The cylinders and cones whose resolution is planned. """
+
+        self.resolutions = resolutions
+        """ (N,) int array with the planned resolution of every blueprint. """
+
+        self.fixedCounts = fixedCounts
+        """ The counts of all other meshes, e.g. cuboids and prisms, whose detail is fixed. """
+
+        self.curvedCounts = curvedCounts
+        self.triangleBudget = triangleBudget
+
+    @property
+    def counts(self) -> MeshCounts:
+        return self.fixedCounts + self.curvedCounts
+
+    @property
+    def isWithinBudget(self) -> bool:
+        return self.counts.triangles <= self.triangleBudget
+
+    def apply(self):
+        """Sets the planned resolutions. Changed blueprints get new cache keys."""
+        for blueprint, resolution in zip(self.blueprints, self.resolutions.tolist()):
+            blueprint.resolution = resolution
+
+    def summary(self) -> str:
+        counts = self.counts
+        text = (
+            f"{counts.triangles:,} of {self.triangleBudget:,} triangles, {counts.vertices:,} vertices, "
+            f"about {counts.nbytes / 2**20:.1f} MiB"
+        )
+        if len(self.resolutions):
+            text += (
+                f", {len(self.resolutions)} curved blueprints with resolutions "
+                f"{self.resolutions.min()} to {self.resolutions.max()}"
+            )
+        return text
+
+
+def _frustumParameters(blueprint: Blueprint):
+    """The bot and top radius of a cylinder or cone."""
+    if isinstance(blueprint, CylinderBlueprint):
+        return blueprint.radius, blueprint.radius
+    return blueprint.radius1, blueprint.radius2
+
+
+def planBudget(
+    root: Blueprint,
+    triangleBudget: int,
+    viewpoint=None,
+    weight=None,
+    minResolution=8,
+    maxResolution=256,
+) -> BudgetPlan:
+    """
+    Plans the resolutions of all cylinders and cones below the root, so that the tree has at most
+    triangleBudget triangles. The weight of a blueprint is the function weight(blueprint) if given,
+    otherwise its radius, divided by the distance to the viewpoint if given.
+    If even the minimum resolutions exceed the budget, they are planned anyway and a warning is logged.
+    """
+    fixedCounts = MeshCounts()
+    curved = []
+    for blueprint in meshBlueprints(root):
+        if isinstance(blueprint, (CylinderBlueprint, ConeBlueprint)):
+            curved.append(blueprint)
+        else:
+            fixedCounts += meshCounts(blueprint)
+
+    radii = np.array([_frustumParameters(blueprint) for blueprint in curved], dtype=np.float64)
+    radii = np.abs(radii.reshape(-1, 2))
+    hasBot, hasTop = radii[:, 0] != 0, radii[:, 1] != 0
+    if weight is not None:
+        weights = np.array([weight(blueprint) for blueprint in curved], dtype=np.float64)
+    else:
+        weights = radii.max(axis=1)
+        if viewpoint is not None:
+            positions = np.array(
+                [tuple(blueprint.worldOffset()) for blueprint in curved], dtype=np.float64
+            ).reshape(-1, 3)
+            distances = np.linalg.norm(positions - np.asarray(viewpoint, np.float64), axis=1)
+            # Inside the blueprint, it covers the whole view
+            weights = weights / np.maximum(distances, weights)
+
+    def resolutionsFor(scale: float):
+        return np.clip(np.round(weights * scale), minResolution, maxResolution).astype(np.int64)
+
+    def trianglesFor(resolutions) -> int:
+        return int(frustumCounts(resolutions, hasBot, hasTop)[3].sum())
+
+    available = triangleBudget - fixedCounts.triangles
+    if not curved or trianglesFor(resolutionsFor(0.0)) >= available:
+        resolutions = resolutionsFor(0.0)
+    else:
+        # The triangle count grows with the scale, so bisect for the largest scale within the budget
+        low = 0.0
+        high = maxResolution / max(weights[weights > 0].min(initial=np.inf), 1e-12)
+        if trianglesFor(resolutionsFor(high)) <= available:
+            low = high
+        for _ in range(60):
+            middle = (low + high) / 2
+            if trianglesFor(resolutionsFor(middle)) <= available:
+                low = middle
+            else:
+                high = middle
+        resolutions = resolutionsFor(low)
+
+    vertices, loops, faces, triangles = frustumCounts(resolutions, hasBot, hasTop)
+    plan = BudgetPlan(
+        curved,
+        resolutions,
+        fixedCounts,
+        MeshCounts(int(vertices.sum()), int(loops.sum()), int(faces.sum()), int(triangles.sum())),
+        triangleBudget,
+    )
+    if not plan.isWithinBudget:
+        log.warning("Budget exceeded even with minimum resolutions: %s", plan.summary())
+    else:
+        log.info("%s", plan.summary())
+    return plan
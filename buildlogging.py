@@ -0,0 +1,127 @@
+"""
+Logging of the blueprint creation.
+
+All messages go to loggers below "boxbuilder", one per subsystem (see subsystems). They are quiet by
+default: only warnings are emitted, so per-object debug messages are never formatted. For large builds,
+configureLogging() installs a SummaryHandler that keeps the latest records in a ring buffer and writes
+one line per message kind instead of one line per object.
+"""
+
+import atexit
+import logging
+import sys
+from collections import Counter, deque
+
+rootLoggerName = "boxbuilder"
+
+subsystems = ("create", "collection", "boolean", "mode", "cache", "demo", "worker", "memory", "budget")
+""" The subsystems with their own logger, e.g. "boxbuilder.collection". """
+
+
+def getLogger(subsystem: str = None) -> logging.Logger:
+    """Returns the logger of the subsystem or the root logger of all subsystems."""
+    if subsystem is None:
+        return logging.getLogger(rootLoggerName)
+    return logging.getLogger(f"{rootLoggerName}.{subsystem}")
+
+
+def setSubsystemLevel(subsystem: str, level: int):
+    """Sets the level of a single subsystem, e.g. setSubsystemLevel("collection", logging.DEBUG)."""
+    getLogger(subsystem).setLevel(level)
+
+
+class SummaryHandler(logging.Handler):
+    """
+    Keeps the latest records in a ring buffer and counts the records per logger, level and message
+    template. flush() writes the counts and the buffered records as a short summary. Records at or
+    above flushLevel are written immediately.
+    """
+
+    def __init__(self, capacity=100, flushLevel=logging.ERROR, stream=None):
+        super().__init__()
+
+        self.records: deque[logging.LogRecord] = deque(maxlen=capacity)
+        """ The latest records. Older records are only counted. """
+
+        self.counts: Counter[tuple[str, str, str]] = Counter()
+        """ Record count per (logger name, level name, message template). """
+
+        self.flushLevel = flushLevel
+        self.stream = stream
+
+    def emit(self, record: logging.LogRecord):
+        if record.levelno >= self.flushLevel:
+            self._write(self.format(record))
+            return
+        self.records.append(record)
+        self.counts[(record.name, record.levelname, str(record.msg))] += 1
+
+    def _write(self, text: str):
+        stream = self.stream or sys.stderr
+        stream.write(text + "\n")
+        stream.flush()
+
+    def summary(self, lastRecords=10) -> str:
+        lines = [
+            f"{count:>8} x {levelName} {loggerName}: {template}"
+            for (loggerName, levelName, template), count in self.counts.most_common()
+        ]
+        if lastRecords and self.records:
+            lines.append(f"Last {min(lastRecords, len(self.records))} messages:")
+            lines.extend(
+                "    " + self.format(record) for record in list(self.records)[-lastRecords:]
+            )
+        return "\n".join(lines)
+
+    def flush(self):
+        """Writes the summary and starts counting anew."""
+        self.acquire()
+        try:
+            if self.counts:
+                self._write(self.summary())
+            self.records.clear()
+            self.counts.clear()
+        finally:
+            self.release()
+
+
+summaryHandler: SummaryHandler = None
+""" The handler installed by configureLogging() or None. """
+
+
+def configureLogging(level=logging.WARNING, summarize=True, capacity=100, stream=None):
+    """
+    Sets the level of all subsystems. With summarize, records are collected by a SummaryHandler and
+    written by flushSummary() (and at exit). Otherwise every record is written directly.
+    """
+    global summaryHandler
+
+    logger = getLogger()
+    logger.setLevel(level)
+    for subsystem in subsystems:
+        getLogger(subsystem).setLevel(logging.NOTSET)
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    if summarize:
+        summaryHandler = SummaryHandler(capacity, stream=stream)
+        handler = summaryHandler
+    else:
+        summaryHandler = None
+        handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.propagate = False
+
+
+def flushSummary():
+    """Writes the summary of the records collected since the last flush."""
+    if summaryHandler:
+        summaryHandler.flush()
+
+
+atexit.register(flushSummary)
+
+# Quiet by default, so debug messages of single objects cost only a level check
+getLogger().setLevel(logging.WARNING)
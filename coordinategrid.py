@@ -0,0 +1,106 @@
+"""
+Optional fixed-point coordinates: all coordinates are rounded to multiples of a grid spacing.
+
+    coordinategrid.enable(1e-5)     # 0.01 mm
+
+Blueprint coordinates are built up by repeated additions (move(), thickness adjustments, direction sums),
+so equal parts end up with slightly different floats. With the grid enabled, parameters are hashed as
+integer grid units, so cache keys and shape keys of equal parts are equal, generated vertices and object
+locations are snapped to the grid, and boolean operands are nudged by whole grid steps (see
+boxbuilder.nudgeOperand()) instead of relying on values like height=1.0001.
+"""
+
+spacing: float = None
+""" The grid spacing in meters or None if coordinates are not quantized. """
+
+coordinateParameters = frozenset(
+    {
+        # Positions
+        "offset",
+        "left",
+        "right",
+        "bot",
+        "top",
+        "back",
+        "front",
+        "vertices",
+        "basePoints",
+        "botPoints",
+        "topPoints",
+        "innerPoints",
+        "outerPoints",
+        "offsettedPoints",
+        "halfOffsettedPoints",
+        "botLeft",
+        "botRight",
+        "topLeft",
+        "topRight",
+        "botLeftInner",
+        "botRightInner",
+        "topLeftInner",
+        "topRightInner",
+        # Lengths
+        "size",
+        "width",
+        "height",
+        "depth",
+        "radius",
+        "radius1",
+        "radius2",
+        "botRadius",
+        "topRadius",
+        "frameThickness",
+        "thickness",
+        "spacingX",
+        "spacingY",
+    }
+)
+""" The blueprint parameters holding coordinates or lengths, which are hashed as grid steps. """
+
+nudgeSteps = 2
+""" The number of grid steps boolean operands are grown or shrunk by on every side. """
+
+
+def enable(gridSpacing=1e-5):
+    """Quantizes all coordinates to the grid spacing. Cache keys change with the spacing."""
+    global spacing
+    if gridSpacing <= 0:
+        raise ValueError(f"Grid spacing must be positive, not {gridSpacing}")
+    spacing = float(gridSpacing)
+
+
+def disable():
+    global spacing
+    spacing = None
+
+
+def toUnits(value: float) -> int:
+    """The value as a whole number of grid steps. Requires an enabled grid."""
+    return round(value / spacing)
+
+
+def snap(value: float) -> float:
+    """The nearest grid coordinate or the value itself if the grid is disabled."""
+    if spacing is None:
+        return value
+    return toUnits(value) * spacing
+
+
+def snapVector(vector):
+    """A Vector with every component snapped."""
+    from mathutils import Vector
+
+    if spacing is None:
+        return Vector(vector)
+    return Vector([snap(component) for component in vector])
+
+
+def snapArray(array):
+    """A NumPy array with every element snapped, in the same dtype."""
+    import numpy as np
+
+    if spacing is None:
+        return array
+    return (np.round(np.asarray(array, dtype=np.float64) / spacing) * spacing).astype(
+        np.asarray(array).dtype
+    )
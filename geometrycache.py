@@ -0,0 +1,147 @@
+"""
+On-disk cache of evaluated blueprint geometry that survives Blender sessions.
+"""
+
+import hashlib
+import json
+import numbers
+import os
+import shutil
+from enum import Enum
+from typing import TYPE_CHECKING
+
+import coordinategrid
+
+if TYPE_CHECKING:
+    from meshbuffers import MeshBuffers
+
+
+def canonicalParameter(value, isCoordinate=False):
+    """
+    Converts a blueprint parameter into a JSON value that is equal for equal parameters.
+    With the coordinate grid enabled, coordinates and lengths (see coordinategrid.coordinateParameters)
+    are compared as whole grid steps. Other floats, e.g. tolerances, keep their exact value.
+    """
+    if isinstance(value, Enum):
+        return f"{type(value).__name__}.{value.name}"
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    if isCoordinate and isinstance(value, numbers.Real) and coordinategrid.spacing is not None:
+        # Integers too, so 0 and 0.0 are equal coordinates
+        return f"{coordinategrid.toUnits(float(value))}*{coordinategrid.spacing!r}"
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return repr(float(value))
+    if isinstance(value, dict):
+        return {
+            str(key): canonicalParameter(
+                item, isCoordinate or key in coordinategrid.coordinateParameters
+            )
+            for key, item in value.items()
+        }
+    if hasattr(value, "parameters"):
+        # Blueprints referenced by other blueprints, e.g. the children of merged containers
+        return {
+            "type": type(value).__name__,
+            "parameters": canonicalParameter(value.parameters()),
+            "booleanOperations": canonicalParameter(
+                [(operation, other.cacheKey()) for operation, other in value.booleanOperations]
+            ),
+        }
+    # Vectors, tuples and lists
+    return [canonicalParameter(item, isCoordinate) for item in value]
+
+
+def hashParameters(parameters) -> str:
+    """Returns a hex digest of the canonical JSON form of the parameters."""
+    text = json.dumps(canonicalParameter(parameters), sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class GeometryCache:
+    """
+    Stores MeshBuffers in a directory, one sub directory with .npy files per key.
+    Entries are loaded memory-mapped and the least recently used ones are evicted
+    when the cache grows beyond maxBytes.
+    """
+
+    formatVersion = 1
+    """ Increase this when the layout of the stored files changes. """
+
+    def __init__(self, directory: str, maxBytes=1 << 30):
+        self.directory = directory
+        """ The directory containing one sub directory per cache entry. """
+
+        self.maxBytes = maxBytes
+        """ Entries are evicted until the cache is smaller than this. """
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _entryDirectory(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.v{GeometryCache.formatVersion}")
+
+    def get(self, key: str) -> "MeshBuffers":
+        """Returns the memory-mapped buffers stored for the key or None."""
+        from meshbuffers import MeshBuffers
+
+        entryDirectory = self._entryDirectory(key)
+        try:
+            buffers = MeshBuffers.load(entryDirectory, mmap=True)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+
+        # Mark as recently used for the eviction
+        os.utime(entryDirectory)
+        self.hits += 1
+        return buffers
+
+    def put(self, key: str, buffers: "MeshBuffers"):
+        """Stores the buffers for the key and evicts old entries if neccessary."""
+        entryDirectory = self._entryDirectory(key)
+        temporaryDirectory = f"{entryDirectory}.{os.getpid()}.tmp"
+        buffers.save(temporaryDirectory)
+        try:
+            os.replace(temporaryDirectory, entryDirectory)
+        except OSError:
+            # Another process stored the same entry in the meantime
+            shutil.rmtree(temporaryDirectory, ignore_errors=True)
+
+        self.evict()
+
+    def entries(self) -> list[tuple[str, float, int]]:
+        """Returns (path, last use time, size in bytes) of every entry."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir() or entry.name.endswith(".tmp"):
+                continue
+            size = sum(file.stat().st_size for file in os.scandir(entry.path))
+            entries.append((entry.path, entry.stat().st_mtime, size))
+        return entries
+
+    @property
+    def size(self) -> int:
+        """The size of all entries in bytes."""
+        return sum(size for _, _, size in self.entries())
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits into maxBytes."""
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        size = sum(entrySize for _, _, entrySize in entries)
+        for path, _, entrySize in entries:
+            if size <= self.maxBytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            size -= entrySize
+
+    def clear(self):
+        """Removes all entries."""
+        for path, _, _ in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    def __repr__(self) -> str:
+        return f"GeometryCache: {self.directory} ({self.hits} hits, {self.misses} misses)"
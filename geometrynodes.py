@@ -0,0 +1,187 @@
+"""
+Geometry Nodes backend for large regular arrays of blueprints, e.g. rows of dowels or grids of windows.
+
+Instead of one object per element, an ArrayBlueprint creates a single object holding the mesh of the
+element and a Geometry Nodes modifier that instances it on a grid of points. Blender evaluates the
+instances natively and changing the count or spacing of the array is a single modifier input update.
+"""
+
+from __future__ import annotations
+
+import bpy
+from mathutils import Vector
+
+from boxbuilder import Blueprint
+from instrumentation import instrumentation
+
+nodeGroupName = "BlueprintArray"
+""" The node group shared by all arrays. """
+
+inputSockets = (
+    ("CountX", "NodeSocketInt", 1),
+    ("CountY", "NodeSocketInt", 1),
+    ("SpacingX", "NodeSocketVector", (1.0, 0.0, 0.0)),
+    ("SpacingY", "NodeSocketVector", (0.0, 1.0, 0.0)),
+)
+""" (name, socket type, default value) of the inputs following the geometry input. """
+
+
+def _newSocket(nodeGroup, name: str, inOut: str, socketType: str):
+    """Adds an interface socket. Blender 4.0 replaced inputs/outputs by the interface."""
+    if hasattr(nodeGroup, "interface"):
+        return nodeGroup.interface.new_socket(
+            name=name, in_out=inOut, socket_type=socketType
+        )
+    sockets = nodeGroup.inputs if inOut == "INPUT" else nodeGroup.outputs
+    return sockets.new(socketType, name)
+
+
+def getArrayNodeGroup() -> bpy.types.NodeTree:
+    """
+    Returns the node group, creating it the first time:
+    the input geometry is instanced on a grid of CountX * CountY points spaced by SpacingX and SpacingY.
+    """
+    nodeGroup = bpy.data.node_groups.get(nodeGroupName)
+    if nodeGroup:
+        return nodeGroup
+
+    nodeGroup = bpy.data.node_groups.new(nodeGroupName, "GeometryNodeTree")
+    _newSocket(nodeGroup, "Geometry", "INPUT", "NodeSocketGeometry")
+    for name, socketType, default in inputSockets:
+        socket = _newSocket(nodeGroup, name, "INPUT", socketType)
+        socket.default_value = default
+        if socketType == "NodeSocketInt":
+            socket.min_value = 0
+    _newSocket(nodeGroup, "Geometry", "OUTPUT", "NodeSocketGeometry")
+
+    nodes = nodeGroup.nodes
+    links = nodeGroup.links
+    groupInput = nodes.new("NodeGroupInput")
+    groupOutput = nodes.new("NodeGroupOutput")
+
+    # A row along SpacingX, instanced along SpacingY and realized to get the grid points
+    rowX = nodes.new("GeometryNodeMeshLine")
+    rowX.mode = "OFFSET"
+    rowY = nodes.new("GeometryNodeMeshLine")
+    rowY.mode = "OFFSET"
+    links.new(groupInput.outputs["CountX"], rowX.inputs["Count"])
+    links.new(groupInput.outputs["SpacingX"], rowX.inputs["Offset"])
+    links.new(groupInput.outputs["CountY"], rowY.inputs["Count"])
+    links.new(groupInput.outputs["SpacingY"], rowY.inputs["Offset"])
+
+    rows = nodes.new("GeometryNodeInstanceOnPoints")
+    links.new(rowX.outputs["Mesh"], rows.inputs["Points"])
+    links.new(rowY.outputs["Mesh"], rows.inputs["Instance"])
+    grid = nodes.new("GeometryNodeRealizeInstances")
+    links.new(rows.outputs["Instances"], grid.inputs["Geometry"])
+
+    # The element itself stays an instance, so Blender does not copy its mesh per point
+    elements = nodes.new("GeometryNodeInstanceOnPoints")
+    links.new(grid.outputs["Geometry"], elements.inputs["Points"])
+    links.new(groupInput.outputs["Geometry"], elements.inputs["Instance"])
+    links.new(elements.outputs["Instances"], groupOutput.inputs["Geometry"])
+
+    for index, node in enumerate(
+        [groupInput, rowX, rowY, rows, grid, elements, groupOutput]
+    ):
+        node.location = (index * 200, 0)
+
+    return nodeGroup
+
+
+def _inputIdentifiers(nodeGroup) -> dict[str, str]:
+    """The modifier property names of the group inputs by socket name."""
+    if hasattr(nodeGroup, "interface"):
+        return {
+            item.name: item.identifier
+            for item in nodeGroup.interface.items_tree
+            if item.item_type == "SOCKET" and item.in_out == "INPUT"
+        }
+    return {socket.name: socket.identifier for socket in nodeGroup.inputs}
+
+
+class ArrayBlueprint(Blueprint):
+    """Repeats an element blueprint on a grid of countX * countY positions, evaluated by Geometry Nodes."""
+
+    usesPrecomputedGeometry = False
+    """ The object holds the mesh of the element only, not the realized geometry(). """
+
+    def __init__(
+        self,
+        element: Blueprint,
+        parent: Blueprint = None,
+        name="Array",
+        countX=10,
+        countY=1,
+        spacingX=Vector((1, 0, 0)),
+        spacingY=Vector((0, 1, 0)),
+        offset=Vector((0, 0, 0)),
+    ):
+        super().__init__(name, parent, offset)
+
+        self.element = element
+        """ The repeated blueprint. Only its geometry is used, it is not created itself. """
+
+        self.countX = countX
+        self.countY = countY
+        self.spacingX = Vector(spacingX)
+        self.spacingY = Vector(spacingY)
+
+    @property
+    def modifier(self) -> bpy.types.NodesModifier:
+        """The Geometry Nodes modifier of the created object or None."""
+        return self.object.modifiers.get(nodeGroupName) if self.object else None
+
+    def positions(self):
+        """The (countX * countY, 3) element positions, in the order Geometry Nodes creates them."""
+        import numpy as np
+
+        indicesX, indicesY = np.meshgrid(
+            np.arange(self.countX), np.arange(self.countY), indexing="ij"
+        )
+        return (
+            indicesX.reshape(-1, 1) * np.asarray(self.spacingX)
+            + indicesY.reshape(-1, 1) * np.asarray(self.spacingY)
+        )
+
+    def geometry(self):
+        """The realized mesh of all elements, for consumers that do not evaluate Geometry Nodes."""
+        return self.element.geometry().repeated(self.positions())
+
+    def _createBlenderObject(self) -> bpy.types.Object:
+        """Creates an object with the mesh of the element and the array modifier."""
+        with instrumentation.stage(self, "geometry") as stage:
+            buffers = self.element.geometry()
+            if buffers is None:
+                raise ValueError("The element of an array must have a mesh.")
+            buffers = buffers.transformed()
+            stage.vertices = buffers.vertexCount
+        blenderObject = self._createObjectFromBuffers(buffers)
+
+        modifier = blenderObject.modifiers.new(nodeGroupName, "NODES")
+        modifier.node_group = getArrayNodeGroup()
+        self._setInputs(blenderObject)
+        return blenderObject
+
+    def _setInputs(self, blenderObject: bpy.types.Object):
+        modifier = blenderObject.modifiers[nodeGroupName]
+        identifiers = _inputIdentifiers(modifier.node_group)
+        modifier[identifiers["CountX"]] = self.countX
+        modifier[identifiers["CountY"]] = self.countY
+        modifier[identifiers["SpacingX"]] = tuple(self.spacingX)
+        modifier[identifiers["SpacingY"]] = tuple(self.spacingY)
+        # Custom property changes are not tracked by the depsgraph
+        blenderObject.update_tag()
+
+    def setArray(self, countX=None, countY=None, spacingX=None, spacingY=None):
+        """Changes count or spacing. For created arrays, only the modifier inputs are updated."""
+        if countX is not None:
+            self.countX = countX
+        if countY is not None:
+            self.countY = countY
+        if spacingX is not None:
+            self.spacingX = Vector(spacingX)
+        if spacingY is not None:
+            self.spacingY = Vector(spacingY)
+        if self.object:
+            self._setInputs(self.object)
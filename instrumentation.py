@@ -0,0 +1,189 @@
+"""
+Per blueprint class and per stage timing and counters of the scene creation.
+
+Instrumentation is off by default. Enable it with instrumentation.setLevel(Level.Counters)
+or by setting the environment variable BLUEPRINT_INSTRUMENTATION to "counters" or "trace".
+"""
+
+import json
+import os
+import time
+from enum import Enum
+
+import buildlogging
+
+log = buildlogging.getLogger("instrumentation")
+
+
+class Level(Enum):
+    Off = 0
+    """Nothing is recorded. """
+    Counters = 1
+    """Call counts, cumulative times and vertices are recorded per blueprint class and stage. """
+    Trace = 2
+    """Additionally every single stage is recorded as event for the Chrome trace export. """
+
+
+class StageStatistics:
+    """The accumulated counters of one stage of one blueprint class."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.vertices = 0
+
+    def toDict(self) -> dict:
+        return {"count": self.count, "seconds": self.seconds, "vertices": self.vertices}
+
+
+class StageTimer:
+    """Context manager measuring one stage. Set vertices inside the with block to count produced vertices."""
+
+    __slots__ = ("instrumentation", "className", "stageName", "vertices", "start")
+
+    def __init__(self, instrumentation: "Instrumentation", className, stageName):
+        self.instrumentation = instrumentation
+        self.className = className
+        self.stageName = stageName
+        self.vertices = 0
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.instrumentation._record(self, time.perf_counter())
+        return False
+
+
+class DisabledStageTimer:
+    """Stands in for StageTimer while instrumentation is off, so measuring costs nearly nothing."""
+
+    vertices = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+disabledStageTimer = DisabledStageTimer()
+
+
+class Instrumentation:
+    """Collects StageStatistics per (blueprint class, stage) and trace events."""
+
+    def __init__(self, level=Level.Off):
+        self.level = level
+
+        self.statistics: dict[tuple[str, str], StageStatistics] = {}
+        """ The counters per (blueprint class name, stage name). """
+
+        self.events: list[tuple[str, str, float, float, int]] = []
+        """ (class name, stage name, start, duration, vertices) of every stage, only recorded with Level.Trace. """
+
+        self.startTime = time.perf_counter()
+
+    def setLevel(self, level: Level):
+        self.level = level
+
+    @property
+    def enabled(self) -> bool:
+        return self.level != Level.Off
+
+    def stage(self, blueprint, stageName: str):
+        """
+        Returns a context manager measuring the stage for the class of the blueprint.
+        Instead of a blueprint, a name can be given for stages that do not belong to a blueprint.
+        """
+        if self.level == Level.Off:
+            return disabledStageTimer
+        className = blueprint if isinstance(blueprint, str) else type(blueprint).__name__
+        return StageTimer(self, className, stageName)
+
+    def _record(self, timer: StageTimer, end: float):
+        duration = end - timer.start
+        key = (timer.className, timer.stageName)
+        statistics = self.statistics.get(key)
+        if statistics is None:
+            statistics = self.statistics[key] = StageStatistics()
+        statistics.count += 1
+        statistics.seconds += duration
+        statistics.vertices += timer.vertices
+
+        if self.level == Level.Trace:
+            self.events.append(
+                (timer.className, timer.stageName, timer.start, duration, timer.vertices)
+            )
+
+    def reset(self):
+        self.statistics.clear()
+        self.events.clear()
+        self.startTime = time.perf_counter()
+
+    # Export
+
+    def report(self) -> dict:
+        """The statistics as {class name: {stage name: {count, seconds, vertices}}}."""
+        report = {}
+        for (className, stageName), statistics in sorted(self.statistics.items()):
+            report.setdefault(className, {})[stageName] = statistics.toDict()
+        return report
+
+    def writeJson(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def chromeTrace(self) -> dict:
+        """The recorded events in the Chrome trace event format (chrome://tracing, Perfetto)."""
+        processId = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": stageName,
+                    "cat": className,
+                    "ph": "X",
+                    "ts": (start - self.startTime) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": processId,
+                    "tid": 0,
+                    "args": {"vertices": vertices},
+                }
+                for className, stageName, start, duration, vertices in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def writeChromeTrace(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.chromeTrace(), file)
+
+    def summary(self) -> str:
+        """A human readable table of the statistics."""
+        lines = [f"{'Class':<28}{'Stage':<16}{'Count':>9}{'Seconds':>12}{'Vertices':>12}"]
+        for (className, stageName), statistics in sorted(self.statistics.items()):
+            lines.append(
+                f"{className:<28}{stageName:<16}{statistics.count:>9}"
+                f"{statistics.seconds:>12.4f}{statistics.vertices:>12}"
+            )
+        return "\n".join(lines)
+
+
+def _environmentLevel() -> Level:
+    """The level from the environment variable BLUEPRINT_INSTRUMENTATION, Off if unset or unknown."""
+    value = os.environ.get("BLUEPRINT_INSTRUMENTATION", "off")
+    try:
+        return Level[value.strip().capitalize()]
+    except KeyError:
+        log.warning(
+            "Unknown BLUEPRINT_INSTRUMENTATION %r, expected one of %s. Instrumentation is off.",
+            value,
+            ", ".join(level.name.lower() for level in Level),
+        )
+        return Level.Off
+
+
+instrumentation = Instrumentation(_environmentLevel())
+""" The instrumentation used by the blueprints. """
@@ -1,3 +1,10 @@
-filename = "boxbuilder.py"
-script = open(filename).read()
-exec(compile(script, filename, "exec"))
+import os
+import sys
+
+# Make the sibling modules importable when Blender runs this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Only modules changed since the last run are reloaded
+import runner
+
+runner.run()
@@ -0,0 +1,213 @@
+"""
+Volume, surface area and mass of blueprints without creating meshes, e.g. for costing.
+
+    properties = massProperties(box, density=700)
+    print(properties.volume, properties.area, properties.mass)
+
+Cuboids, cylinders, cones and prisms are evaluated analytically, all blueprints of a type at once with
+NumPy. Cylinders and cones are regular polygons of their resolution, so the results match the created
+meshes exactly. Everything else, e.g. boolean results, is measured on its mesh buffers with the
+divergence theorem.
+"""
+
+import numpy as np
+
+import boxbuilder
+from boxbuilder import (
+    Blueprint,
+    BlueprintContainer,
+    ConeBlueprint,
+    CuboidBlueprint,
+    CylinderBlueprint,
+    PrismBlueprint,
+)
+from meshbuffers import MeshBuffers
+from meshvalidation import faceAreas
+
+
+class MassProperties:
+    """Volume, surface area and mass of one or more parts. Properties of several parts add up."""
+
+    def __init__(self, volume=0.0, area=0.0, mass=0.0):
+        self.volume = volume
+        self.area = area
+        self.mass = mass
+
+    def __add__(self, other: "MassProperties") -> "MassProperties":
+        return MassProperties(
+            self.volume + other.volume, self.area + other.area, self.mass + other.mass
+        )
+
+    def __repr__(self) -> str:
+        return f"MassProperties: volume {self.volume:.6g}, area {self.area:.6g}, mass {self.mass:.6g}"
+
+
+def parts(root: Blueprint) -> list[Blueprint]:
+    """
+    The blueprints below the root that are measured: all blueprints except containers, merged containers
+    as a whole. Boolean operands are part of the result of their boolean operation and are left out.
+    """
+    found = []
+    pending = [root]
+    while pending:
+        blueprint = pending.pop()
+        if isinstance(blueprint, BlueprintContainer) and not blueprint.isMerged:
+            pending.extend(reversed(blueprint.children))
+        else:
+            found.append(blueprint)
+
+    operandIds = {
+        id(other) for blueprint in found for _, other in blueprint.booleanOperations
+    }
+    return [blueprint for blueprint in found if id(blueprint) not in operandIds]
+
+
+def frustumProperties(sideCounts, botRadii, topRadii, heights):
+    """
+    Volumes and areas of frusta of regular polygons, given by their circumradii. A radius of 0 is an apex.
+    Similar parallel bases: V = h / 3 * (A1 + A2 + sqrt(A1 * A2)).
+    """
+    sideCounts = np.asarray(sideCounts, dtype=np.float64)
+    botRadii = np.abs(np.asarray(botRadii, dtype=np.float64))
+    topRadii = np.abs(np.asarray(topRadii, dtype=np.float64))
+    heights = np.abs(np.asarray(heights, dtype=np.float64))
+
+    # Base area per squared circumradius
+    polygonFactor = sideCounts / 2 * np.sin(2 * np.pi / sideCounts)
+    botAreas = polygonFactor * botRadii**2
+    topAreas = polygonFactor * topRadii**2
+    volumes = heights / 3 * (botAreas + topAreas + np.sqrt(botAreas * topAreas))
+
+    # The walls are trapezoids between the polygon edges, their height is the slant of the apothems
+    halfAngles = np.pi / sideCounts
+    edgeFactor = 2 * np.sin(halfAngles)
+    slantHeights = np.hypot(heights, (botRadii - topRadii) * np.cos(halfAngles))
+    wallAreas = sideCounts * (botRadii + topRadii) * edgeFactor / 2 * slantHeights
+    return volumes, wallAreas + botAreas + topAreas
+
+
+def cuboidProperties(sizes):
+    """Volumes and areas of cuboids given by their (N, 3) edge lengths."""
+    sizes = np.abs(np.asarray(sizes, dtype=np.float64)).reshape(-1, 3)
+    depth, width, height = sizes.T
+    return depth * width * height, 2 * (depth * width + width * height + height * depth)
+
+
+def meshProperties(buffers: MeshBuffers) -> tuple[float, float]:
+    """The volume (divergence theorem) and the area of a closed mesh. Surfaces have no volume."""
+    buffers = buffers.transformed()
+    return abs(buffers.signedVolume()), float(faceAreas(buffers).sum())
+
+
+def _buffers(blueprint: Blueprint) -> MeshBuffers:
+    """The mesh of a blueprint including its boolean operations."""
+    if not blueprint.booleanOperations or blueprint.hasAnalyticBooleans():
+        buffers = blueprint.precomputedGeometry or blueprint.geometry()
+        return buffers if buffers is not None else MeshBuffers.fromPolygons([], [])
+
+    # Results of boolean modifiers only exist in Blender or in the geometry cache
+    if blueprint.object:
+        return MeshBuffers.fromEvaluatedObject(blueprint.object)
+    if boxbuilder.geometryCache is not None:
+        buffers = boxbuilder.geometryCache.get(blueprint.cacheKey())
+        if buffers is not None:
+            return buffers
+    raise ValueError(
+        f"{blueprint.name} has boolean operations and must be created or cached to be measured."
+    )
+
+
+def _isPlain(blueprint: Blueprint) -> bool:
+    return not blueprint.booleanOperations
+
+
+def volumesAndAreas(blueprints: list[Blueprint]) -> tuple[np.ndarray, np.ndarray]:
+    """The volumes and areas of the blueprints, in the same order. Containers are not aggregated here."""
+    volumes = np.zeros(len(blueprints))
+    areas = np.zeros(len(blueprints))
+
+    cuboids, frusta, others = [], [], []
+    for index, blueprint in enumerate(blueprints):
+        if type(blueprint) is CuboidBlueprint and _isPlain(blueprint):
+            cuboids.append(index)
+        elif isinstance(blueprint, (ConeBlueprint, CylinderBlueprint, PrismBlueprint)) and _isPlain(
+            blueprint
+        ):
+            frusta.append(index)
+        else:
+            others.append(index)
+
+    if cuboids:
+        sizes = [
+            (blueprints[index].depth, blueprints[index].width, blueprints[index].height)
+            for index in cuboids
+        ]
+        volumes[cuboids], areas[cuboids] = cuboidProperties(sizes)
+
+    if frusta:
+        frustumParameters = []
+        for index in frusta:
+            blueprint = blueprints[index]
+            if isinstance(blueprint, ConeBlueprint):
+                frustumParameters.append(
+                    (blueprint.resolution, blueprint.radius1, blueprint.radius2, blueprint.height)
+                )
+            elif isinstance(blueprint, CylinderBlueprint):
+                frustumParameters.append(
+                    (blueprint.resolution, blueprint.radius, blueprint.radius, blueprint.height)
+                )
+            else:
+                frustumParameters.append(
+                    (blueprint.sideCount, blueprint.botRadius, blueprint.topRadius, blueprint.height)
+                )
+        volumes[frusta], areas[frusta] = frustumProperties(*np.array(frustumParameters).T)
+
+    for index in others:
+        volumes[index], areas[index] = meshProperties(_buffers(blueprints[index]))
+
+    return volumes, areas
+
+
+def _densities(blueprints: list[Blueprint], density) -> np.ndarray:
+    """The density per blueprint from a number or a function of the blueprint."""
+    if callable(density):
+        return np.array([density(blueprint) for blueprint in blueprints], dtype=np.float64)
+    return np.full(len(blueprints), density, dtype=np.float64)
+
+
+def massProperties(root: Blueprint, density=1.0) -> MassProperties:
+    """The summed properties of all parts of the root. The density is a number or a function of a part."""
+    measured = parts(root)
+    volumes, areas = volumesAndAreas(measured)
+    return MassProperties(
+        float(volumes.sum()),
+        float(areas.sum()),
+        float((volumes * _densities(measured, density)).sum()),
+    )
+
+
+def containerProperties(root: Blueprint, density=1.0) -> dict[int, tuple[Blueprint, MassProperties]]:
+    """
+    The properties of every part and every container below the root, evaluated once and added up along
+    the parents. Returns (blueprint, properties) by id of the blueprint.
+    """
+    measured = parts(root)
+    volumes, areas = volumesAndAreas(measured)
+    masses = volumes * _densities(measured, density)
+
+    results = {}
+    for blueprint, volume, area, mass in zip(
+        measured, volumes.tolist(), areas.tolist(), masses.tolist()
+    ):
+        properties = MassProperties(volume, area, mass)
+        node = blueprint
+        while node is not None:
+            previous = results.get(id(node))
+            results[id(node)] = (
+                node,
+                properties if previous is None else previous[1] + properties,
+            )
+            if node is root:
+                break
+            node = node.parent
+    return results
@@ -0,0 +1,211 @@
+"""
+Memory accounting of repeated builds: bpy.data datablock counts, orphaned datablocks and the Python heap.
+
+    with tracker.track("demo"):
+        buildDemoScene()
+    print(tracker.history[-1].summary())
+
+After each tracked build, orphaned datablocks are purged according to the purge policy of the tracker.
+checkSteadyState() rebuilds a scene many times and fails if memory keeps growing. Run it headless with
+
+    blender -b --factory-startup --python memorytracking.py
+"""
+
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+moduleDirectory = os.path.dirname(os.path.abspath(__file__))
+if moduleDirectory not in sys.path:
+    # Blender does not add the directory of a --python script
+    sys.path.insert(0, moduleDirectory)
+
+import bpy
+
+import buildlogging
+
+log = buildlogging.getLogger("memory")
+
+trackedCollections = (
+    "objects",
+    "meshes",
+    "collections",
+    "materials",
+    "node_groups",
+    "images",
+    "textures",
+    "curves",
+)
+""" The bpy.data collections that are counted. """
+
+
+def datablockCounts() -> dict[str, int]:
+    """The number of datablocks per tracked bpy.data collection."""
+    return {name: len(getattr(bpy.data, name)) for name in trackedCollections}
+
+
+def orphanCounts() -> dict[str, int]:
+    """The number of datablocks without users (and without fake user) per tracked collection."""
+    return {
+        name: sum(
+            1
+            for datablock in getattr(bpy.data, name)
+            if datablock.users == 0 and not datablock.use_fake_user
+        )
+        for name in trackedCollections
+    }
+
+
+def purgeOrphans() -> int:
+    """Removes all orphaned datablocks, also the ones that become orphans by this. Returns the number removed."""
+    before = sum(datablockCounts().values())
+    bpy.data.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
+    return before - sum(datablockCounts().values())
+
+
+class MemorySnapshot:
+    """The memory state at one point in time."""
+
+    def __init__(self, tracePython: bool):
+        self.datablocks = datablockCounts()
+        self.orphans = orphanCounts()
+
+        self.pythonBytes = tracemalloc.get_traced_memory()[0] if tracePython else None
+        """ The size of the Python heap traced by tracemalloc or None if not traced. """
+
+
+class BuildMemory:
+    """The memory changes of one tracked build."""
+
+    def __init__(self, name: str, before: MemorySnapshot, after: MemorySnapshot, purgedCount: int):
+        self.name = name
+        self.before = before
+        self.after = after
+        """ The state after the build and the purge. """
+
+        self.purgedCount = purgedCount
+        """ The number of orphans removed after the build. """
+
+    @property
+    def datablockDeltas(self) -> dict[str, int]:
+        """The change of the datablock counts, without unchanged collections."""
+        deltas = {
+            name: self.after.datablocks[name] - self.before.datablocks[name]
+            for name in trackedCollections
+        }
+        return {name: delta for name, delta in deltas.items() if delta}
+
+    @property
+    def orphanCount(self) -> int:
+        return sum(self.after.orphans.values())
+
+    @property
+    def pythonDelta(self) -> int:
+        """The growth of the traced Python heap in bytes or None if not traced."""
+        if self.before.pythonBytes is None:
+            return None
+        return self.after.pythonBytes - self.before.pythonBytes
+
+    def summary(self) -> str:
+        deltas = ", ".join(f"{name} {delta:+}" for name, delta in self.datablockDeltas.items())
+        text = f"{self.name}: datablocks {deltas or 'unchanged'}, {self.orphanCount} orphans, {self.purgedCount} purged"
+        if self.pythonDelta is not None:
+            text += f", Python heap {self.pythonDelta / 1024:+.1f} KiB"
+        return text
+
+
+class MemoryTracker:
+    """
+    Tracks builds and purges orphans afterwards: with a purgeThreshold of 0 after every build, otherwise
+    once there are at least that many orphans, never if it is None.
+    """
+
+    def __init__(self, purgeThreshold: int = 0, tracePython=False):
+        self.purgeThreshold = purgeThreshold
+
+        self.tracePython = tracePython
+        """ If true, the Python heap is measured with tracemalloc, which slows down allocations. """
+
+        self.history: list[BuildMemory] = []
+
+    @contextmanager
+    def track(self, name="build"):
+        """Measures the memory before and after the block and applies the purge policy."""
+        if self.tracePython and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        before = MemorySnapshot(self.tracePython)
+        try:
+            yield self
+        finally:
+            purgedCount = 0
+            orphanCount = sum(orphanCounts().values())
+            if self.purgeThreshold is not None and orphanCount >= max(self.purgeThreshold, 1):
+                purgedCount = purgeOrphans()
+
+            buildMemory = BuildMemory(
+                name, before, MemorySnapshot(self.tracePython), purgedCount
+            )
+            self.history.append(buildMemory)
+            log.info("%s", buildMemory.summary())
+
+
+tracker = MemoryTracker()
+""" The tracker used by the runner. """
+
+
+def checkSteadyState(
+    build,
+    iterations=100,
+    warmup=5,
+    pythonTolerance=256 * 1024,
+) -> list[BuildMemory]:
+    """
+    Calls build(clear=True) iterations times and raises an AssertionError if the datablock or orphan counts
+    change after the warmup builds or the Python heap grows by more than pythonTolerance bytes over the rest.
+    Orphans are compared to the first build after the warmup, not to zero: clearing the scene orphans
+    datablocks of the startup file, e.g. the materials of the default objects, which are no leaks.
+    """
+    # Orphans that exist before any build are not caused by it
+    purgeOrphans()
+
+    # Without purging, so orphans left by the build show up
+    steadyTracker = MemoryTracker(purgeThreshold=None, tracePython=True)
+    wasTracing = tracemalloc.is_tracing()
+    try:
+        for index in range(iterations):
+            with steadyTracker.track(f"build {index}"):
+                build(clear=True)
+    finally:
+        if not wasTracing:
+            tracemalloc.stop()
+
+    history = steadyTracker.history
+    steady = history[warmup:]
+    reference = steady[0].after
+    for buildMemory in steady[1:]:
+        if buildMemory.after.datablocks != reference.datablocks:
+            raise AssertionError(
+                f"Datablocks grow: {reference.datablocks} after {steady[0].name}, "
+                f"{buildMemory.after.datablocks} after {buildMemory.name}"
+            )
+        if buildMemory.after.orphans != reference.orphans:
+            raise AssertionError(
+                f"Orphans grow: {reference.orphans} after {steady[0].name}, "
+                f"{buildMemory.after.orphans} after {buildMemory.name}"
+            )
+
+    growth = steady[-1].after.pythonBytes - reference.pythonBytes
+    if growth > pythonTolerance:
+        raise AssertionError(
+            f"Python heap grew by {growth} bytes over {len(steady) - 1} builds"
+        )
+    return history
+
+
+if __name__ == "__main__":
+    import boxbuilder
+
+    history = checkSteadyState(boxbuilder.buildDemoScene)
+    print(history[-1].summary())
+    print(f"Steady state over {len(history)} builds")
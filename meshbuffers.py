@@ -0,0 +1,492 @@
+"""
+Flat NumPy buffers describing a mesh, used to move geometry between blueprints, Blender and the disk.
+"""
+
+import os
+
+import numpy as np
+
+
+class MeshBuffers:
+    """Vertices and faces of a mesh stored in contiguous NumPy arrays."""
+
+    def __init__(self, vertices, loops, faceSizes, matrix=None, uvs=None):
+        self.vertices = vertices
+        """ (N, 3) float32 array of vertex coordinates in object space. """
+
+        self.loops = loops
+        """ (L,) int32 array with the vertex index of every face corner. """
+
+        self.faceSizes = faceSizes
+        """ (F,) int32 array with the number of corners of every face. """
+
+        self.matrix = np.identity(4, dtype=np.float32) if matrix is None else matrix
+        """ (4, 4) float32 array of the object transform (matrix_basis). """
+
+        self.uvs = uvs
+        """ (L, 2) float32 array with the UV coordinates of every face corner or None if there are no UVs. """
+
+    @staticmethod
+    def fromPolygons(vertices, faces) -> "MeshBuffers":
+        """Creates buffers from a vertex list and a list of faces given as vertex index tuples."""
+        return MeshBuffers(
+            np.asarray(vertices, dtype=np.float32).reshape(-1, 3),
+            np.fromiter(
+                (index for face in faces for index in face), dtype=np.int32
+            ),
+            np.fromiter((len(face) for face in faces), dtype=np.int32),
+        )
+
+    @staticmethod
+    def cuboid(minimum, maximum) -> "MeshBuffers":
+        """An axis-aligned cuboid with outward faces. The vertices are centered and the matrix moves them into place."""
+        minimum = np.asarray(minimum, dtype=np.float32)
+        maximum = np.asarray(maximum, dtype=np.float32)
+
+        # Vertex index is x * 4 + y * 2 + z with 0 for the minimum and 1 for the maximum
+        corners = (np.arange(8)[:, None] >> np.array([2, 1, 0])) & 1
+        vertices = (corners - 0.5) * (maximum - minimum)
+
+        matrix = np.identity(4, dtype=np.float32)
+        matrix[:3, 3] = (minimum + maximum) / 2
+
+        return MeshBuffers(
+            vertices.astype(np.float32),
+            MeshBuffers.cuboidLoops.copy(),
+            np.full(6, 4, dtype=np.int32),
+            matrix,
+        )
+
+    cuboidLoops = np.array(
+        [0, 1, 3, 2, 4, 6, 7, 5, 0, 4, 5, 1, 2, 3, 7, 6, 0, 2, 6, 4, 1, 5, 7, 3],
+        dtype=np.int32,
+    )
+    """ Faces of cuboid() in the order back, front, left, right, bot, top. """
+
+    @staticmethod
+    def frustum(sideCount, botRadius, topRadius, botZ, topZ) -> "MeshBuffers":
+        """
+        A regular prism, cylinder or cone around the z axis with outward faces.
+        A radius of 0 creates a single apex vertex instead of a ring.
+        """
+        angles = np.arange(sideCount) * (2 * np.pi / sideCount)
+        ring = np.column_stack((np.cos(angles), np.sin(angles)))
+
+        def ringVertices(radius, z):
+            if radius == 0:
+                return np.array([[0, 0, z]])
+            return np.column_stack((ring * radius, np.full(sideCount, z)))
+
+        botVertices = ringVertices(botRadius, botZ)
+        topVertices = ringVertices(topRadius, topZ)
+        botCount = len(botVertices)
+        vertices = np.concatenate((botVertices, topVertices)).astype(np.float32)
+
+        current = np.arange(sideCount, dtype=np.int32)
+        following = (current + 1) % sideCount
+        faces = []
+        faceSizes = []
+
+        # Cylindrical UVs in meters: around the mean circumference and along the slant height.
+        # The last wall ends at u = circumference instead of wrapping around to 0.
+        arcLength = np.pi * (botRadius + topRadius) / sideCount
+        slantHeight = np.hypot(topZ - botZ, topRadius - botRadius)
+        uStart, uEnd = current * arcLength, (current + 1) * arcLength
+        vBot, vTop = np.full(sideCount, botZ), np.full(sideCount, botZ + slantHeight)
+
+        # Walls, going anticlockwise around the z axis
+        if botRadius == 0:
+            walls = np.column_stack(
+                (np.zeros(sideCount, np.int32), botCount + following, botCount + current)
+            )
+            wallUs = np.column_stack(((uStart + uEnd) / 2, uEnd, uStart))
+            wallVs = np.column_stack((vBot, vTop, vTop))
+        elif topRadius == 0:
+            walls = np.column_stack(
+                (current, following, np.full(sideCount, botCount, np.int32))
+            )
+            wallUs = np.column_stack((uStart, uEnd, (uStart + uEnd) / 2))
+            wallVs = np.column_stack((vBot, vBot, vTop))
+        else:
+            walls = np.column_stack(
+                (current, following, botCount + following, botCount + current)
+            )
+            wallUs = np.column_stack((uStart, uEnd, uEnd, uStart))
+            wallVs = np.column_stack((vBot, vBot, vTop, vTop))
+        faces.append(walls.ravel())
+        faceSizes.append(np.full(sideCount, walls.shape[1], np.int32))
+        uvs = [np.column_stack((wallUs.ravel(), wallVs.ravel()))]
+
+        # Caps, the bot one is reversed to face downwards. Planar UVs, mirrored for the bot cap.
+        if botRadius != 0:
+            faces.append(current[::-1])
+            faceSizes.append([sideCount])
+            uvs.append(vertices[current[::-1], :2] * (1, -1))
+        if topRadius != 0:
+            faces.append(botCount + current)
+            faceSizes.append([sideCount])
+            uvs.append(vertices[botCount + current, :2])
+
+        return MeshBuffers(
+            vertices,
+            np.concatenate(faces).astype(np.int32),
+            np.concatenate(faceSizes).astype(np.int32),
+            uvs=np.concatenate(uvs).astype(np.float32),
+        )
+
+    @staticmethod
+    def fromBlenderMesh(mesh, matrix=None) -> "MeshBuffers":
+        """Reads the vertices and faces of a Blender mesh with foreach_get."""
+        vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", vertices)
+        loops = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loops)
+        faceSizes = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", faceSizes)
+
+        uvs = None
+        if mesh.uv_layers.active is not None:
+            uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            mesh.uv_layers.active.data.foreach_get("uv", uvs)
+            uvs = uvs.reshape(-1, 2)
+        return MeshBuffers(vertices.reshape(-1, 3), loops, faceSizes, matrix, uvs)
+
+    @staticmethod
+    def fromEvaluatedObject(object) -> "MeshBuffers":
+        """Reads the mesh of an object with all modifiers (e.g. booleans) applied."""
+        import bpy
+
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        evaluatedObject = object.evaluated_get(depsgraph)
+        mesh = evaluatedObject.to_mesh()
+        try:
+            matrix = np.array(object.matrix_basis, dtype=np.float32)
+            return MeshBuffers.fromBlenderMesh(mesh, matrix)
+        finally:
+            evaluatedObject.to_mesh_clear()
+
+    def transformed(self) -> "MeshBuffers":
+        """Returns buffers with the matrix applied to the vertices and an identity matrix."""
+        matrix = np.asarray(self.matrix, dtype=np.float64)
+        vertices = self.vertices @ matrix[:3, :3].T + matrix[:3, 3]
+        return MeshBuffers(
+            vertices.astype(np.float32), self.loops, self.faceSizes, uvs=self.uvs
+        )
+
+    def repeated(self, positions) -> "MeshBuffers":
+        """Returns one copy of the (transformed) mesh at each of the (N, 3) positions, as a single mesh."""
+        source = self.transformed()
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        copyCount = len(positions)
+        vertices = source.vertices[None, :, :] + positions[:, None, :]
+        loops = (
+            source.loops[None, :]
+            + (np.arange(copyCount, dtype=np.int32) * source.vertexCount)[:, None]
+        )
+        return MeshBuffers(
+            vertices.reshape(-1, 3),
+            loops.reshape(-1).astype(np.int32),
+            np.tile(source.faceSizes, copyCount),
+            uvs=None if source.uvs is None else np.tile(source.uvs, (copyCount, 1)),
+        )
+
+    @staticmethod
+    def concatenate(buffersList: list["MeshBuffers"]) -> "MeshBuffers":
+        """
+        Combines the (transformed) meshes into one mesh with an identity matrix. If some of the meshes have
+        UVs, the others get box-projected UVs.
+        """
+        parts = [buffers.transformed() for buffers in buffersList]
+        vertexOffsets = np.cumsum([0] + [part.vertexCount for part in parts[:-1]])
+        uvs = None
+        if any(part.uvs is not None for part in parts):
+            uvs = np.concatenate(
+                [
+                    part.uvs if part.uvs is not None else part.boxProjected().uvs
+                    for part in parts
+                ]
+            ).astype(np.float32)
+        return MeshBuffers(
+            np.concatenate(
+                [part.vertices for part in parts] + [np.empty((0, 3), np.float32)]
+            ),
+            np.concatenate(
+                [part.loops + offset for part, offset in zip(parts, vertexOffsets)]
+                + [np.empty(0, np.int32)]
+            ).astype(np.int32),
+            np.concatenate(
+                [part.faceSizes for part in parts] + [np.empty(0, np.int32)]
+            ).astype(np.int32),
+            uvs=uvs,
+        )
+
+    def welded(self, tolerance=1e-6) -> "MeshBuffers":
+        """
+        Merges vertices that round to the same point of a grid with the tolerance as spacing, keeping the
+        first vertex of each grid point. Corners and faces collapsed by the merge are removed.
+        """
+        if not self.vertexCount:
+            return self
+
+        # Spatial hash: one integer key per grid cell
+        cells = np.round(np.asarray(self.vertices, dtype=np.float64) / tolerance).astype(
+            np.int64
+        )
+        cells -= cells.min(axis=0)
+        extents = cells.max(axis=0) + 1
+        if float(np.prod(extents, dtype=np.float64)) < 2**62:
+            keys = (cells[:, 0] * extents[1] + cells[:, 1]) * extents[2] + cells[:, 2]
+            _, firstIndices, inverse = np.unique(
+                keys, return_index=True, return_inverse=True
+            )
+        else:
+            _, firstIndices, inverse = np.unique(
+                cells, axis=0, return_index=True, return_inverse=True
+            )
+
+        # Number the merged vertices in the order of their first occurrence
+        order = np.argsort(firstIndices)
+        newIndices = np.empty(len(order), dtype=np.int32)
+        newIndices[order] = np.arange(len(order), dtype=np.int32)
+        loops = newIndices[inverse.reshape(-1)][self.loops]
+
+        # Remove corners equal to the following corner, then faces with less than 3 corners
+        starts = self.faceStarts
+        loopFaces = np.repeat(np.arange(self.faceCount), self.faceSizes)
+        nextIndices = np.arange(1, self.loopCount + 1)
+        nextIndices[starts + self.faceSizes - 1] = starts
+        keptLoops = loops != loops[nextIndices]
+        faceSizes = np.bincount(loopFaces[keptLoops], minlength=self.faceCount)
+        keptFaces = faceSizes >= 3
+        keptLoops &= keptFaces[loopFaces]
+
+        return MeshBuffers(
+            np.ascontiguousarray(self.vertices[firstIndices[order]]),
+            loops[keptLoops].astype(np.int32),
+            faceSizes[keptFaces].astype(np.int32),
+            self.matrix,
+            None if self.uvs is None else self.uvs[keptLoops],
+        )
+
+    def snapped(self) -> "MeshBuffers":
+        """
+        Returns the buffers with the transformed vertices rounded to the coordinate grid, if enabled.
+        The translation is snapped as well and the vertices are expressed relative to it again. Snapping
+        the centred vertices and the translation separately would lose a step of odd extents.
+        """
+        import coordinategrid
+
+        if coordinategrid.spacing is None:
+            return self
+        matrix = np.array(self.matrix, dtype=np.float64)
+        snappedVertices = coordinategrid.snapArray(
+            np.asarray(self.vertices, dtype=np.float64) @ matrix[:3, :3].T + matrix[:3, 3]
+        )
+        matrix[:3, 3] = coordinategrid.snapArray(matrix[:3, 3])
+        vertices = (snappedVertices - matrix[:3, 3]) @ np.linalg.inv(matrix[:3, :3]).T
+        return MeshBuffers(
+            vertices.astype(np.float32),
+            self.loops,
+            self.faceSizes,
+            matrix.astype(np.float32),
+            self.uvs,
+        )
+
+    # UVs
+
+    def boxProjected(self, translation=None) -> "MeshBuffers":
+        """
+        Returns the buffers with UVs in meters, projected along the axis closest to the normal of each face.
+        The transformed vertices moved by the translation, e.g. the offset of the parents, are projected,
+        so the textures of neighbouring objects line up.
+        """
+        vertices = self.transformed().vertices.astype(np.float64)
+        if translation is not None:
+            vertices = vertices + np.asarray(translation, dtype=np.float64)
+        normals = MeshBuffers(vertices, self.loops, self.faceSizes).faceNormals()
+        axes = np.argmax(np.abs(normals), axis=1)
+        signs = np.where(normals[np.arange(self.faceCount), axes] < 0, -1.0, 1.0)
+
+        # Seen from outside, u points right and v up (y for the side faces, x for the bot and top faces)
+        loopFaces = np.repeat(np.arange(self.faceCount), self.faceSizes)
+        loopAxes = axes[loopFaces]
+        loopSigns = signs[loopFaces]
+        corners = vertices[self.loops]
+        x, y, z = corners[:, 0], corners[:, 1], corners[:, 2]
+        us = np.select([loopAxes == 0, loopAxes == 1], [loopSigns * y, -loopSigns * x], x)
+        vs = np.select([loopAxes == 2], [loopSigns * y], z)
+        return MeshBuffers(
+            self.vertices,
+            self.loops,
+            self.faceSizes,
+            self.matrix,
+            np.column_stack((us, vs)).astype(np.float32),
+        )
+
+    def writeUvsToBlenderMesh(self, mesh, name="UVMap"):
+        """Uploads the UVs into the UV layer of a mesh with the same loops, with a single foreach_set."""
+        layer = mesh.uv_layers.get(name) or mesh.uv_layers.new(name=name)
+        layer.data.foreach_set(
+            "uv", np.ascontiguousarray(self.uvs, dtype=np.float32).reshape(-1)
+        )
+
+    def writeToBlenderMesh(self, mesh):
+        """
+        Uploads the buffers into an empty Blender mesh with foreach_set.
+        No Python objects are created per vertex or face, and memory-mapped arrays are passed through without a copy.
+        """
+        vertices = np.ascontiguousarray(self.vertices, dtype=np.float32).reshape(-1)
+        loops = np.ascontiguousarray(self.loops, dtype=np.int32)
+
+        mesh.vertices.add(self.vertexCount)
+        mesh.loops.add(self.loopCount)
+        mesh.polygons.add(self.faceCount)
+
+        mesh.vertices.foreach_set("co", vertices)
+        mesh.loops.foreach_set("vertex_index", loops)
+        mesh.polygons.foreach_set("loop_start", self.faceStarts)
+        # Since Blender 4.0 the loop totals are derived from the loop starts.
+        # The property belongs to the element type, not to the mesh.polygons collection.
+        import bpy
+
+        if not bpy.types.MeshPolygon.bl_rna.properties["loop_total"].is_readonly:
+            mesh.polygons.foreach_set(
+                "loop_total", np.ascontiguousarray(self.faceSizes, dtype=np.int32)
+            )
+        if self.uvs is not None:
+            self.writeUvsToBlenderMesh(mesh)
+
+        mesh.update(calc_edges=True)
+
+    @property
+    def vertexCount(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def faceCount(self) -> int:
+        return len(self.faceSizes)
+
+    @property
+    def loopCount(self) -> int:
+        return len(self.loops)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.vertices.nbytes
+            + self.loops.nbytes
+            + self.faceSizes.nbytes
+            + self.matrix.nbytes
+            + (0 if self.uvs is None else self.uvs.nbytes)
+        )
+
+    @property
+    def faceStarts(self):
+        """(F,) int32 array with the index of the first loop of every face."""
+        starts = np.zeros(len(self.faceSizes), dtype=np.int32)
+        np.cumsum(self.faceSizes[:-1], out=starts[1:])
+        return starts
+
+    def faces(self) -> list[tuple]:
+        """The faces as vertex index tuples, e.g. for mesh.from_pydata."""
+        return [
+            tuple(face.tolist())
+            for face in np.split(self.loops, self.faceStarts[1:])
+            if len(face)
+        ]
+
+    # Orientation
+
+    def fanTriangles(self):
+        """(T, 3) vertex indices of the triangle fans of all faces. Exact for the convex faces generated here."""
+        starts = self.faceStarts
+        loopFaces = np.repeat(np.arange(self.faceCount), self.faceSizes)
+        cornerIndices = np.arange(self.loopCount) - starts[loopFaces]
+        # Every corner from the third one on closes a triangle with the first and the previous corner
+        last = np.nonzero(cornerIndices >= 2)[0]
+        return np.column_stack(
+            (self.loops[starts[loopFaces[last]]], self.loops[last - 1], self.loops[last])
+        )
+
+    def faceNormals(self):
+        """(F, 3) face normals by Newell's method with a length of twice the face area, as float64."""
+        if not self.faceCount:
+            return np.empty((0, 3))
+        starts = self.faceStarts
+        nextIndices = np.arange(1, self.loopCount + 1)
+        # The last corner of a face connects back to its first corner
+        nextIndices[starts + self.faceSizes - 1] = starts
+        x, y, z = np.asarray(self.vertices, dtype=np.float64).T
+        loops = np.asarray(self.loops, dtype=np.int64)
+        edgeStarts, edgeEnds = loops, loops[nextIndices]
+        return np.column_stack(
+            [
+                np.add.reduceat(
+                    a[edgeStarts] * b[edgeEnds] - b[edgeStarts] * a[edgeEnds], starts
+                )
+                for a, b in ((y, z), (z, x), (x, y))
+            ]
+        )
+
+    def signedVolume(self) -> float:
+        """The enclosed volume (divergence theorem). Negative if the faces point inwards."""
+        vertices = np.asarray(self.vertices, dtype=np.float64)
+        triangles = vertices[self.fanTriangles()]
+        return float(
+            np.einsum(
+                "ij,ij->i",
+                triangles[:, 0],
+                np.cross(triangles[:, 1], triangles[:, 2]),
+            ).sum()
+            / 6
+        )
+
+    def flipped(self) -> "MeshBuffers":
+        """Returns buffers with the corner order of every face reversed, which flips all normals."""
+        starts = self.faceStarts
+        loopFaces = np.repeat(np.arange(self.faceCount), self.faceSizes)
+        cornerIndices = np.arange(self.loopCount) - starts[loopFaces]
+        reversedIndices = starts[loopFaces] + self.faceSizes[loopFaces] - 1 - cornerIndices
+        return MeshBuffers(
+            self.vertices,
+            self.loops[reversedIndices],
+            self.faceSizes,
+            self.matrix,
+            None if self.uvs is None else self.uvs[reversedIndices],
+        )
+
+    def orientedOutward(self) -> "MeshBuffers":
+        """Returns the buffers of a closed mesh with all faces pointing outwards."""
+        return self.flipped() if self.signedVolume() < 0 else self
+
+    # Files
+
+    arrayNames = ("vertices", "loops", "faceSizes", "matrix", "uvs")
+    """ The arrays written by save(), each to its own .npy file. Missing UVs are not written. """
+
+    def save(self, directory: str):
+        """Writes every array into an .npy file in the given directory."""
+        os.makedirs(directory, exist_ok=True)
+        for arrayName in MeshBuffers.arrayNames:
+            if getattr(self, arrayName) is None:
+                continue
+            np.save(
+                os.path.join(directory, arrayName + ".npy"),
+                np.ascontiguousarray(getattr(self, arrayName)),
+            )
+
+    @staticmethod
+    def load(directory: str, mmap=True) -> "MeshBuffers":
+        """Loads buffers written by save(). With mmap the arrays are memory-mapped instead of read."""
+        mmapMode = "r" if mmap else None
+        arrays = {}
+        for arrayName in MeshBuffers.arrayNames:
+            path = os.path.join(directory, arrayName + ".npy")
+            if arrayName == "uvs" and not os.path.exists(path):
+                continue
+            arrays[arrayName] = np.load(path, mmap_mode=mmapMode)
+        return MeshBuffers(**arrays)
+
+    def __repr__(self) -> str:
+        return f"MeshBuffers: {self.vertexCount} vertices, {self.faceCount} faces"
+
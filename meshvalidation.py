@@ -0,0 +1,167 @@
+"""
+Vectorized checks of mesh buffers before exporting, e.g. for fabrication after boolean operations.
+
+    report = validate(MeshBuffers.fromEvaluatedObject(cylinder.object))
+    if not report.isValid:
+        print(report.summary())
+
+All checks work on whole arrays, so meshes with millions of faces are validated in seconds.
+"""
+
+import numpy as np
+
+from meshbuffers import MeshBuffers
+
+
+class ValidationReport:
+    """The problems found by validate(). Every problem is stored as an array of indices."""
+
+    def __init__(self, vertexCount: int, faceCount: int, edgeCount: int):
+        self.vertexCount = vertexCount
+        self.faceCount = faceCount
+        self.edgeCount = edgeCount
+        """ The number of distinct edges. """
+
+        self.boundaryEdges = np.empty((0, 2), np.int64)
+        """ (E, 2) vertex indices of edges used by a single face. The mesh has holes. """
+
+        self.nonManifoldEdges = np.empty((0, 2), np.int64)
+        """ (E, 2) vertex indices of edges used by more than two faces. """
+
+        self.inconsistentEdges = np.empty((0, 2), np.int64)
+        """ (E, 2) vertex indices of edges walked in the same direction by two faces, which then face opposite sides. """
+
+        self.degenerateFaces = np.empty(0, np.int64)
+        """ Indices of faces with (almost) zero area. """
+
+        self.duplicateVertices = np.empty((0, 2), np.int64)
+        """ (D, 2) pairs of a vertex and the first vertex at the same position. """
+
+        self.unusedVertices = np.empty(0, np.int64)
+        """ Indices of vertices not used by any face. """
+
+    @property
+    def isWatertight(self) -> bool:
+        """Every edge is shared by exactly two faces."""
+        return not len(self.boundaryEdges) and not len(self.nonManifoldEdges)
+
+    @property
+    def isValid(self) -> bool:
+        """Watertight, consistently wound and without degenerate faces or duplicate vertices."""
+        return (
+            self.isWatertight
+            and not len(self.inconsistentEdges)
+            and not len(self.degenerateFaces)
+            and not len(self.duplicateVertices)
+        )
+
+    def counts(self) -> dict:
+        """The number of problems of each kind, e.g. for JSON reports."""
+        return {
+            "vertices": self.vertexCount,
+            "faces": self.faceCount,
+            "edges": self.edgeCount,
+            "boundaryEdges": len(self.boundaryEdges),
+            "nonManifoldEdges": len(self.nonManifoldEdges),
+            "inconsistentEdges": len(self.inconsistentEdges),
+            "degenerateFaces": len(self.degenerateFaces),
+            "duplicateVertices": len(self.duplicateVertices),
+            "unusedVertices": len(self.unusedVertices),
+        }
+
+    def summary(self) -> str:
+        counts = self.counts()
+        lines = [
+            f"{counts['vertices']} vertices, {counts['faces']} faces, {counts['edges']} edges: "
+            + ("valid" if self.isValid else "invalid")
+        ]
+        lines.extend(
+            f"{name:>20}: {count}"
+            for name, count in list(counts.items())[3:]
+            if count
+        )
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"ValidationReport: {'valid' if self.isValid else 'invalid'}"
+
+
+def edgeLoops(buffers: MeshBuffers):
+    """(L,) start and end vertex of the edge following every face corner."""
+    loopIndices = np.arange(buffers.loopCount)
+    nextIndices = loopIndices + 1
+    # The last corner of a face connects back to its first corner
+    starts = buffers.faceStarts
+    nextIndices[starts + buffers.faceSizes - 1] = starts
+    loops = np.asarray(buffers.loops, dtype=np.int64)
+    return loops, loops[nextIndices]
+
+
+def faceAreas(buffers: MeshBuffers):
+    """(F,) face areas by Newell's method, which also works for non-planar and concave faces."""
+    normals = buffers.faceNormals()
+    return 0.5 * np.sqrt(np.einsum("ij,ij->i", normals, normals))
+
+
+def validate(
+    buffers: MeshBuffers, areaTolerance=1e-12, distanceTolerance=0.0
+) -> ValidationReport:
+    """
+    Checks the edge use, the face areas and the vertex positions of the buffers.
+    With a distanceTolerance, vertices in the same cell of a grid of that size count as duplicates.
+    """
+    vertexCount = buffers.vertexCount
+
+    # Edge use: each edge gets a key of its sorted vertex indices
+    edgeStarts, edgeEnds = edgeLoops(buffers)
+    lower = np.minimum(edgeStarts, edgeEnds)
+    upper = np.maximum(edgeStarts, edgeEnds)
+    keys, useCounts = np.unique(lower * vertexCount + upper, return_counts=True)
+
+    def edgeVertices(edgeKeys):
+        return np.column_stack(np.divmod(edgeKeys, max(vertexCount, 1)))
+
+    report = ValidationReport(vertexCount, buffers.faceCount, len(keys))
+    report.boundaryEdges = edgeVertices(keys[useCounts == 1])
+    report.nonManifoldEdges = edgeVertices(keys[useCounts > 2])
+
+    # Consistent winding: neighbouring faces walk their shared edge in opposite directions
+    directedKeys, directedCounts = np.unique(
+        edgeStarts * vertexCount + edgeEnds, return_counts=True
+    )
+    report.inconsistentEdges = edgeVertices(directedKeys[directedCounts > 1])
+
+    report.degenerateFaces = np.nonzero(faceAreas(buffers) <= areaTolerance)[0]
+
+    # Duplicate vertices: sorted by (quantized) position, equal positions are neighbours
+    if vertexCount:
+        positions = np.asarray(buffers.vertices, dtype=np.float64)
+        if distanceTolerance > 0:
+            positions = np.floor(positions / distanceTolerance)
+        order = np.lexsort((np.arange(vertexCount), *positions.T[::-1]))
+        sortedPositions = positions[order]
+        isDuplicate = np.all(sortedPositions[1:] == sortedPositions[:-1], axis=1)
+        # Index of the first vertex of each run of equal positions
+        runStarts = np.maximum.accumulate(
+            np.where(np.concatenate(([False], isDuplicate)), 0, np.arange(vertexCount))
+        )
+        duplicates = np.nonzero(isDuplicate)[0] + 1
+        report.duplicateVertices = np.column_stack(
+            (order[duplicates], order[runStarts[duplicates]])
+        )
+
+    used = np.zeros(vertexCount, dtype=bool)
+    used[buffers.loops] = True
+    report.unusedVertices = np.nonzero(~used)[0]
+
+    return report
+
+
+def validateBlenderMesh(mesh, **options) -> ValidationReport:
+    """Validates a Blender mesh, read with foreach_get."""
+    return validate(MeshBuffers.fromBlenderMesh(mesh), **options)
+
+
+def validateObject(object, **options) -> ValidationReport:
+    """Validates the mesh of an object with all modifiers, e.g. unapplied booleans, evaluated."""
+    return validate(MeshBuffers.fromEvaluatedObject(object), **options)
@@ -0,0 +1,265 @@
+"""
+Partitioned output of huge blueprint trees into library .blend files, linked by a lightweight master file.
+
+    plan = partitionByContainer(root, "out/house")       # or partitionByTile(root, "out/house", 50)
+    writeChunks(plan)                                    # or writeChunks(plan, pool) with a WorkerPool
+    writeMaster(plan)
+    ...
+    writeChunks(plan, names=["Roof"])                    # rebuilds a single chunk
+
+Every chunk is a .blend file holding one collection with the objects of its blueprints. The master file
+holds a scene with one collection instance per chunk, so it stays small and each chunk can be rebuilt and
+saved on its own. Chunks are built without the rest of the tree: their roots are temporarily detached and
+placed at their world offset.
+"""
+
+import math
+import os
+import re
+from contextlib import contextmanager
+
+from mathutils import Vector
+
+from boxbuilder import Blueprint, BlueprintContainer, CuboidBlueprint
+
+
+class Chunk:
+    """The blueprints written into one library file."""
+
+    def __init__(self, name: str, roots: list[Blueprint], path: str):
+        self.name = name
+        """ The name of the collection in the library file and of the file. """
+
+        self.roots = roots
+        """ The blueprints of the chunk with all blueprints below them. """
+
+        self.path = path
+
+
+class PartitionPlan:
+    """The chunks of a tree and where the library files and the master file are written."""
+
+    def __init__(self, name: str, directory: str, chunks: list[Chunk]):
+        self.name = name
+        self.directory = os.path.abspath(directory)
+        self.chunks = chunks
+
+    @property
+    def masterPath(self) -> str:
+        return os.path.join(self.directory, f"{_fileName(self.name)}_master.blend")
+
+    def chunk(self, name: str) -> Chunk:
+        for chunk in self.chunks:
+            if chunk.name == name:
+                return chunk
+        raise KeyError(f"No chunk {name} in {self.name}")
+
+
+def _fileName(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def _plan(root: Blueprint, directory: str, groups: dict[str, list[Blueprint]]) -> PartitionPlan:
+    directory = os.path.abspath(directory)
+    chunks = []
+    usedNames = {f"{_fileName(root.name)}_master"}
+    for name, roots in groups.items():
+        # The collection is named like the file, so workers can derive it from the path
+        name = _fileName(name)
+        if name in usedNames:
+            name = f"{name}_{len(chunks)}"
+        usedNames.add(name)
+        chunks.append(Chunk(name, roots, os.path.join(directory, f"{name}.blend")))
+    return PartitionPlan(root.name, directory, chunks)
+
+
+def partitionByContainer(root: BlueprintContainer, directory: str) -> PartitionPlan:
+    """One chunk per container below the root. The other children of the root share a chunk."""
+    groups: dict[str, list[Blueprint]] = {}
+    loose = []
+    for child in root.children:
+        if isinstance(child, BlueprintContainer):
+            name = child.name
+            while name in groups or name == root.name:
+                name += "_"
+            groups[name] = [child]
+        else:
+            loose.append(child)
+    if loose:
+        groups[root.name] = loose
+    return _plan(root, directory, groups)
+
+
+def _tiledBlueprints(root: Blueprint) -> list[Blueprint]:
+    """The blueprints that are assigned to tiles: merged containers as a whole, no boolean operands."""
+    found = []
+    pending = [root]
+    while pending:
+        blueprint = pending.pop()
+        if isinstance(blueprint, BlueprintContainer) and not blueprint.isMerged:
+            pending.extend(reversed(blueprint.children))
+        else:
+            found.append(blueprint)
+
+    # Operands are created by the blueprint they belong to
+    operandIds = {id(other) for blueprint in found for _, other in blueprint.booleanOperations}
+    return [blueprint for blueprint in found if id(blueprint) not in operandIds]
+
+
+def _position(blueprint: Blueprint) -> Vector:
+    """Where the blueprint ends up in the scene, without needing Blender."""
+    if isinstance(blueprint, CuboidBlueprint):
+        return blueprint.worldOffset() + (blueprint.backleftbot + blueprint.frontrighttop) / 2
+    return blueprint.worldOffset()
+
+
+def partitionByTile(root: Blueprint, directory: str, tileSize: float) -> PartitionPlan:
+    """One chunk per square tile of the xy plane containing at least one blueprint."""
+    groups: dict[str, list[Blueprint]] = {}
+    for blueprint in _tiledBlueprints(root):
+        position = _position(blueprint)
+        tile = (math.floor(position.x / tileSize), math.floor(position.y / tileSize))
+        groups.setdefault(f"{root.name}_tile_{tile[0]}_{tile[1]}", []).append(blueprint)
+    return _plan(root, directory, groups)
+
+
+def _subtree(blueprint: Blueprint):
+    """The blueprint and all blueprints below it, including the children of merged containers."""
+    pending = [blueprint]
+    while pending:
+        blueprint = pending.pop()
+        yield blueprint
+        if isinstance(blueprint, BlueprintContainer):
+            pending.extend(reversed(blueprint.children))
+
+
+def _operandRoots(roots: list[Blueprint]) -> list[Blueprint]:
+    """The boolean operands of the blueprints below the roots that are not below the roots themselves."""
+    insideIds = {id(blueprint) for root in roots for blueprint in _subtree(root)}
+    operands = []
+    pending = list(roots)
+    while pending:
+        root = pending.pop()
+        for blueprint in _subtree(root):
+            for _, other in blueprint.booleanOperations:
+                if id(other) not in insideIds:
+                    insideIds.update(id(operand) for operand in _subtree(other))
+                    operands.append(other)
+                    pending.append(other)
+    return operands
+
+
+def _checkPlacement(blueprints: list[Blueprint], worldOffsets: dict[int, Vector]):
+    """
+    Raises if a detached blueprint does not end up where it is in the whole tree. Boolean results only
+    depend on where base and operands are, so they then match the unpartitioned build.
+    """
+    for blueprint in blueprints:
+        if (blueprint.worldOffset() - worldOffsets[id(blueprint)]).length > 1e-9:
+            raise ValueError(f"{blueprint.name} is not placed as in the whole tree")
+
+
+@contextmanager
+def detached(roots: list[Blueprint]):
+    """
+    Temporarily removes the parents of the roots and moves the roots to their world offset, so they can
+    be built or serialized without the rest of the tree. Boolean operands outside the roots, e.g. siblings
+    in the same container, are detached and moved along, so they cut at the same place.
+    """
+    moved = list(roots) + _operandRoots(roots)
+    blueprints = [blueprint for root in moved for blueprint in _subtree(root)]
+    worldOffsets = {id(blueprint): blueprint.worldOffset() for blueprint in blueprints}
+
+    saved = [(blueprint.parent, blueprint.offset) for blueprint in moved]
+    for blueprint in moved:
+        blueprint.offset = worldOffsets[id(blueprint)]
+    for blueprint in moved:
+        blueprint.parent = None
+    try:
+        _checkPlacement(blueprints, worldOffsets)
+        yield roots
+    finally:
+        for blueprint, (parent, offset) in zip(moved, saved):
+            blueprint.parent = parent
+            blueprint.offset = offset
+
+
+def writeLibrary(roots: list[Blueprint], name: str, path: str) -> int:
+    """
+    Builds the blueprints into a collection of the given name, writes it into a library file and removes
+    everything created again, so memory does not grow from chunk to chunk. Returns the number of objects.
+    """
+    import bpy
+
+    from boxbuilder import buildCollectionProperty, createTreesBatched, removeObjects
+
+    collection = bpy.data.collections.new(name)
+    collection[buildCollectionProperty] = True
+    bpy.context.scene.collection.children.link(collection)
+    createTreesBatched(roots, collection)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    bpy.data.libraries.write(path, {collection}, fake_user=True, compress=True)
+
+    # Hidden boolean operands are written as dependencies of the modifiers and removed as well
+    blueprints = [blueprint for root in roots for blueprint in root.walk()]
+    blueprints += [other for blueprint in blueprints for _, other in blueprint.booleanOperations]
+    objects = list(
+        {id(blueprint.object): blueprint.object for blueprint in blueprints if blueprint.object}.values()
+    )
+    removeObjects(objects)
+    bpy.data.collections.remove(collection)
+    for blueprint in blueprints:
+        blueprint.object = None
+    return len(objects)
+
+
+def writeChunks(plan: PartitionPlan, pool=None, names: list[str] = None):
+    """
+    Writes the library files of the chunks (all or the named ones). Without pool, they are built in this
+    Blender one after the other. With a WorkerPool, they are built in the background and a list of
+    futures is returned.
+    """
+    chunks = plan.chunks if names is None else [plan.chunk(name) for name in names]
+    if pool is None:
+        for chunk in chunks:
+            with detached(chunk.roots):
+                writeLibrary(chunk.roots, chunk.name, chunk.path)
+        return []
+
+    import serialization
+
+    futures = []
+    for chunk in chunks:
+        with detached(chunk.roots):
+            data = serialization.dumps(chunk.roots)
+        futures.append(pool.submit(data, chunk.path, "library"))
+    return futures
+
+
+def writeMaster(plan: PartitionPlan):
+    """Writes the master file with a scene that links every chunk as a collection instance."""
+    import bpy
+
+    scene = bpy.data.scenes.new(plan.name)
+    created = [scene]
+    for chunk in plan.chunks:
+        with bpy.data.libraries.load(chunk.path, link=True) as (dataFrom, dataTo):
+            dataTo.collections = [chunk.name]
+        collection = dataTo.collections[0]
+        if collection is None:
+            raise ValueError(f"{chunk.path} contains no collection {chunk.name}")
+
+        instance = bpy.data.objects.new(chunk.name, None)
+        instance.instance_type = "COLLECTION"
+        instance.instance_collection = collection
+        scene.collection.objects.link(instance)
+        created += [instance, collection.library]
+
+    try:
+        # The chunks are linked relative to the master file, so the directory can be moved
+        bpy.data.libraries.write(
+            plan.masterPath, {scene}, path_remap="RELATIVE_ALL", fake_user=True
+        )
+    finally:
+        bpy.data.batch_remove(created)
@@ -0,0 +1,165 @@
+"""
+Runs a scene build function and, on every further run in the same Blender session, reloads only the
+modules whose source changed. Unchanged modules keep their compiled code and changed ones are compiled
+through the regular import system, so their bytecode is cached in __pycache__.
+
+main.py calls run() each time it is executed.
+"""
+
+import ast
+import hashlib
+import importlib
+import os
+import sys
+
+moduleDirectory = os.path.dirname(os.path.abspath(__file__))
+
+
+class ModuleReloader:
+    """Tracks the source files of the modules in a directory and reloads the changed ones."""
+
+    def __init__(self, directory: str = moduleDirectory):
+        self.directory = directory
+
+        self.fingerprints: dict[str, tuple[float, str]] = {}
+        """ (modification time, source hash) per module name at the time it was last (re)loaded. """
+
+    def moduleNames(self) -> list[str]:
+        """The names of all modules in the directory except this runner."""
+        return sorted(
+            fileName[:-3]
+            for fileName in os.listdir(self.directory)
+            if fileName.endswith(".py") and fileName != "runner.py"
+        )
+
+    def _path(self, moduleName: str) -> str:
+        return os.path.join(self.directory, moduleName + ".py")
+
+    def _fingerprint(self, moduleName: str, previous=None) -> tuple[float, str]:
+        """Hashes the source only if the modification time changed."""
+        modificationTime = os.path.getmtime(self._path(moduleName))
+        if previous and previous[0] == modificationTime:
+            return previous
+        with open(self._path(moduleName), "rb") as file:
+            return modificationTime, hashlib.sha256(file.read()).hexdigest()
+
+    def changedModules(self) -> set[str]:
+        """
+        The loaded modules whose source differs from the time they were loaded. Modules seen for the first
+        time only get their fingerprint, reloading them would e.g. reset the logging configuration.
+        """
+        changed = set()
+        for moduleName in self.moduleNames():
+            if moduleName not in sys.modules:
+                continue
+            previous = self.fingerprints.get(moduleName)
+            fingerprint = self._fingerprint(moduleName, previous)
+            if previous is not None and fingerprint[1] != previous[1]:
+                changed.add(moduleName)
+            self.fingerprints[moduleName] = fingerprint
+        return changed
+
+    def dependencies(self) -> dict[str, set[str]]:
+        """The modules of the directory imported by each module of the directory."""
+        moduleNames = set(self.moduleNames())
+        dependencies = {}
+        for moduleName in moduleNames:
+            with open(self._path(moduleName), "rb") as file:
+                tree = ast.parse(file.read())
+            imported = set()
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    imported.update(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module:
+                    imported.add(node.module)
+            dependencies[moduleName] = (imported & moduleNames) - {moduleName}
+        return dependencies
+
+    def reload(self) -> list[str]:
+        """
+        Reloads the changed modules and the modules importing them, dependencies first.
+        Returns the names of the reloaded modules.
+        """
+        changed = self.changedModules()
+        if not changed:
+            return []
+
+        dependencies = self.dependencies()
+
+        # Modules importing a changed module hold references to its old contents
+        affected = set(changed)
+        while True:
+            dependents = {
+                moduleName
+                for moduleName, imported in dependencies.items()
+                if imported & affected and moduleName in sys.modules
+            }
+            if dependents <= affected:
+                break
+            affected |= dependents
+
+        reloaded = []
+
+        def reloadWithDependencies(moduleName: str):
+            if moduleName in reloaded:
+                return
+            reloaded.append(moduleName)
+            for dependency in sorted(dependencies[moduleName] & affected):
+                reloadWithDependencies(dependency)
+            importlib.reload(sys.modules[moduleName])
+            self.fingerprints[moduleName] = self._fingerprint(moduleName)
+
+        for moduleName in sorted(affected):
+            reloadWithDependencies(moduleName)
+        return reloaded
+
+
+reloader = ModuleReloader()
+""" Kept in sys.modules between runs, so it remembers the fingerprints of the previous run. """
+
+
+def run(moduleName="boxbuilder", entryPoint="buildDemoScene", incremental=True):
+    """
+    Reloads changed modules and calls the entry point of the module. The entry point gets a clear argument.
+    With incremental, objects whose blueprint did not change are reused instead of clearing the scene.
+    Objects that do not come from blueprints, e.g. the default cube, are still removed, as by the clear.
+    """
+    if moduleDirectory not in sys.path:
+        sys.path.insert(0, moduleDirectory)
+
+    reloaded = reloader.reload()
+    module = importlib.import_module(moduleName)
+
+    import buildlogging
+
+    log = buildlogging.getLogger("create")
+    if reloaded:
+        log.info("Reloaded %s", ", ".join(reloaded))
+
+    import memorytracking
+
+    build = getattr(module, entryPoint)
+    try:
+        # Purges the orphans of the previous run and logs the datablock changes
+        with memorytracking.tracker.track(f"{moduleName}.{entryPoint}"):
+            if not incremental:
+                build(clear=True)
+                return
+
+            import bpy
+
+            keyProperty = module.IncrementalBuild.keyProperty
+            module.setObjectMode()
+            module.removeObjects(
+                [object for object in bpy.context.scene.objects if not object.get(keyProperty)]
+            )
+            with module.IncrementalBuild() as incrementalBuild:
+                build(clear=False)
+        log.info(
+            "Reused %s objects, removed %s objects",
+            incrementalBuild.reusedCount,
+            incrementalBuild.removedCount,
+        )
+    finally:
+        # Remember the modules imported for the first time, including lazily imported ones
+        reloader.changedModules()
@@ -0,0 +1,161 @@
+"""
+Builds blueprint trees in small time slices from bpy.app.timers, so Blender's UI stays responsive.
+
+    scheduler = BuildScheduler([box, frame], executor=ThreadPoolExecutor())
+    scheduler.start()
+    ...
+    scheduler.cancel()
+"""
+
+import time
+from concurrent.futures import Executor
+
+import bpy
+
+import buildlogging
+
+log = buildlogging.getLogger("create")
+
+
+def computeGeometry(blueprint):
+    """Computes the geometry of a blueprint. Module level function, so it can be sent to process pools."""
+    return blueprint.geometry()
+
+
+class BuildScheduler:
+    """
+    Runs the createSteps() generators of blueprints in chunks of at most budget seconds per timer call.
+    With an executor, the geometry of all blueprints is computed by the executor in the background and
+    only uploaded on the main thread. Process pools need blueprints that can be pickled.
+    """
+
+    def __init__(
+        self,
+        blueprints: list,
+        budget=0.016,
+        executor: Executor = None,
+        onProgress=None,
+        onFinished=None,
+    ):
+        self.blueprints = blueprints
+        """ The root blueprints to create. """
+
+        self.budget = budget
+        """ The maximum time in seconds spent per timer call. """
+
+        self.executor = executor
+        """ If set, computes the geometry in the background. """
+
+        self.onProgress = onProgress
+        """ Called with the scheduler after every chunk. """
+
+        self.onFinished = onFinished
+        """ Called with the scheduler when all blueprints are created or the build was cancelled. """
+
+        self.pollInterval = 0.01
+        """ The time in seconds until the next timer call while waiting for background geometry. """
+
+        self.total = sum(1 for root in blueprints for _ in root.walk())
+        """ The number of blueprints to create. """
+
+        self.done = 0
+        """ The number of created blueprints. """
+
+        self.isCancelled = False
+        self.isFinished = False
+        self.futures = {}
+        """ The background geometry computations by id of the blueprint. """
+
+        self.steps = self._steps()
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    def start(self):
+        """Starts the build. The blueprints are created by timer calls afterwards."""
+        if self.executor:
+            self._submitGeometry()
+
+        windowManager = bpy.context.window_manager
+        if windowManager:
+            windowManager.progress_begin(0, max(self.total, 1))
+        bpy.app.timers.register(self._step, first_interval=0)
+
+    def cancel(self):
+        """Stops the build after the current chunk. Already created objects are kept."""
+        self.isCancelled = True
+
+    def _submitGeometry(self):
+        for root in self.blueprints:
+            for blueprint in root.walk():
+                if blueprint.usesPrecomputedGeometry and blueprint.precomputedGeometry is None:
+                    self.futures[id(blueprint)] = self.executor.submit(
+                        computeGeometry, blueprint
+                    )
+
+    def _steps(self):
+        """
+        Yields after each created blueprint. Yields True while waiting for background geometry, which is
+        checked again on the next timer call.
+        """
+        index = 0
+        for root in self.blueprints:
+            # Resuming createSteps creates the blueprint it yielded before
+            for blueprint in root.createSteps():
+                self.done = index
+                future = self.futures.pop(id(blueprint), None)
+                if future is not None:
+                    # Wait for the geometry without blocking the UI
+                    while not future.done():
+                        yield True
+                    blueprint.precomputedGeometry = future.result()
+                index += 1
+                yield
+        self.done = index
+
+    def _step(self):
+        """Timer callback. Returns the interval until the next call or None to stop."""
+        if self.isCancelled:
+            self._finish()
+            return None
+
+        deadline = time.perf_counter() + self.budget
+        interval = 0.001
+        try:
+            while time.perf_counter() < deadline:
+                if next(self.steps):
+                    interval = self.pollInterval
+                    break
+        except StopIteration:
+            self._finish()
+            return None
+        except Exception:
+            log.exception("Scheduled build failed")
+            self._finish()
+            return None
+
+        windowManager = bpy.context.window_manager
+        if windowManager:
+            windowManager.progress_update(self.done)
+        if self.onProgress:
+            self.onProgress(self)
+        return interval
+
+    def _finish(self):
+        self.isFinished = True
+        for future in self.futures.values():
+            future.cancel()
+        self.futures.clear()
+
+        windowManager = bpy.context.window_manager
+        if windowManager:
+            windowManager.progress_end()
+        log.info(
+            "Scheduled build %s: %s of %s blueprints",
+            "cancelled" if self.isCancelled else "finished",
+            self.done,
+            self.total,
+        )
+        if self.onFinished:
+            self.onFinished(self)
@@ -0,0 +1,489 @@
+"""
+Serialization of blueprint trees, e.g. to send a scene description to worker processes or to diff scenes.
+
+    with open("scene.blueprints", "wb") as file:
+        dump([box, frame], file)
+    with open("scene.blueprints", "rb") as file:
+        box, frame = load(file)
+
+A file is a flat sequence of nodes, one per blueprint, starting with the roots. References between
+blueprints (parent, children, boolean operands, ...) are stored as node indices, so deep trees need no
+recursion and blueprints referenced several times are stored once. Nodes are written and read one after
+the other. Loading creates the blueprints with object.__new__ and sets their attributes, __init__ is not
+called.
+
+There are two formats: a compact binary format (the default) and JSON lines with one node per line for
+debugging. load() detects the format.
+"""
+
+import importlib
+import json
+import numbers
+import struct
+from collections import deque
+from enum import Enum
+
+from mathutils import Vector
+
+from boxbuilder import Blueprint
+
+formatVersion = 1
+""" Increase this when the layout of the nodes changes. Files of other versions are rejected. """
+
+magic = b"BLUEPRNT"
+""" The first bytes of a binary file. """
+
+transientAttributes = {"object": None, "precomputedGeometry": None}
+""" Attributes referring to Blender or computed data. They are not stored and get these values when loading. """
+
+# Value tags of the binary format
+NONE, TRUE, FALSE, INT, FLOAT, STRING, LIST, TUPLE, VECTOR, ENUM, REFERENCE, DICT = range(12)
+
+packDouble = struct.Struct("<d").pack
+unpackDouble = struct.Struct("<d").unpack_from
+headerStruct = struct.Struct("<HI")
+""" Format version and root count, following the magic bytes. """
+lengthStruct = struct.Struct("<I")
+""" The byte length in front of every node. """
+
+
+def classPath(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+_resolvedClasses: dict[str, type] = {}
+
+
+def resolveClass(path: str, baseClass: type) -> type:
+    """Imports the class of a class path. Only subclasses of the base class are accepted."""
+    cls = _resolvedClasses.get(path)
+    if cls is None:
+        moduleName, qualifiedName = path.split(":")
+        cls = importlib.import_module(moduleName)
+        for name in qualifiedName.split("."):
+            cls = getattr(cls, name)
+        _resolvedClasses[path] = cls
+    if not (isinstance(cls, type) and issubclass(cls, baseClass)):
+        raise ValueError(f"{path} is not a {baseClass.__name__}")
+    return cls
+
+
+class _NodeWriter:
+    """Numbers the blueprints in the order they are found and yields them with their stored attributes."""
+
+    def __init__(self):
+        self.indices: dict[int, int] = {}
+        """ Node index by id of the blueprint. """
+
+        self.pending: deque[Blueprint] = deque()
+        """ Blueprints that got an index but were not written yet. """
+
+    def reference(self, blueprint: Blueprint) -> int:
+        index = self.indices.get(id(blueprint))
+        if index is None:
+            index = self.indices[id(blueprint)] = len(self.indices)
+            self.pending.append(blueprint)
+        return index
+
+    def nodes(self, roots: list[Blueprint]):
+        for root in roots:
+            self.reference(root)
+        while self.pending:
+            blueprint = self.pending.popleft()
+            yield blueprint, [
+                (name, value)
+                for name, value in vars(blueprint).items()
+                if name not in transientAttributes
+            ]
+
+
+class _NodeReader:
+    """Creates the blueprints of the nodes. Referenced nodes that were not read yet are created empty."""
+
+    def __init__(self):
+        self.nodes: list[Blueprint] = []
+
+    def reference(self, index: int) -> Blueprint:
+        nodes = self.nodes
+        while len(nodes) <= index:
+            nodes.append(object.__new__(Blueprint))
+        return nodes[index]
+
+    def setNode(self, index: int, cls: type, attributes: dict):
+        blueprint = self.reference(index)
+        # The empty node gets its actual class now. Blueprints have no __slots__, so this is allowed.
+        blueprint.__class__ = cls
+        blueprint.__dict__.update(transientAttributes)
+        blueprint.__dict__.update(attributes)
+
+
+# Binary format
+
+
+def _writeVarint(out: bytearray, value: int):
+    """Unsigned LEB128."""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _readVarint(data, position: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+class _BinaryWriter(_NodeWriter):
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+        self.symbols: dict[str, int] = {}
+        """ Id by string of the names, class paths and enum members written so far. """
+
+        self.shapes: dict[tuple, int] = {}
+        """ Id by (class, attribute names) of the node layouts written so far. """
+
+    def writeSymbol(self, out: bytearray, symbol: str):
+        """Strings repeated in every node are written once and referenced by id afterwards."""
+        symbolId = self.symbols.get(symbol)
+        if symbolId is None:
+            self.symbols[symbol] = len(self.symbols)
+            encoded = symbol.encode()
+            out.append(0)
+            _writeVarint(out, len(encoded))
+            out += encoded
+        else:
+            _writeVarint(out, symbolId + 1)
+
+    def writeValue(self, out: bytearray, value):
+        valueType = type(value)
+        if value is None:
+            out.append(NONE)
+        elif valueType is bool:
+            out.append(TRUE if value else FALSE)
+        elif valueType is float:
+            out.append(FLOAT)
+            out += packDouble(value)
+        elif valueType is int:
+            out.append(INT)
+            # Zigzag, so small negative numbers stay short
+            if 0 <= value < 64:
+                out.append(value << 1)
+            else:
+                _writeVarint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+        elif valueType is str:
+            encoded = value.encode()
+            out.append(STRING)
+            _writeVarint(out, len(encoded))
+            out += encoded
+        elif valueType is list or valueType is tuple:
+            out.append(LIST if valueType is list else TUPLE)
+            _writeVarint(out, len(value))
+            for item in value:
+                self.writeValue(out, item)
+        elif isinstance(value, Vector):
+            out.append(VECTOR)
+            out += struct.pack(f"<B{len(value)}d", len(value), *value)
+        elif isinstance(value, Blueprint):
+            out.append(REFERENCE)
+            _writeVarint(out, self.reference(value))
+        elif isinstance(value, Enum):
+            out.append(ENUM)
+            self.writeSymbol(out, classPath(type(value)))
+            self.writeSymbol(out, value.name)
+        elif isinstance(value, bool):
+            self.writeValue(out, bool(value))
+        elif isinstance(value, numbers.Integral):
+            self.writeValue(out, int(value))
+        elif isinstance(value, numbers.Real):
+            self.writeValue(out, float(value))
+        elif isinstance(value, dict):
+            out.append(DICT)
+            _writeVarint(out, len(value))
+            for key, item in value.items():
+                self.writeValue(out, key)
+                self.writeValue(out, item)
+        else:
+            raise TypeError(f"Cannot serialize {valueType.__name__} values")
+
+    def writeShape(self, out: bytearray, cls: type, names: tuple):
+        """Blueprints of a class mostly have the same attributes, so their names are written once per layout."""
+        shapeId = self.shapes.get((cls, names))
+        if shapeId is None:
+            self.shapes[(cls, names)] = len(self.shapes)
+            out.append(0)
+            self.writeSymbol(out, classPath(cls))
+            _writeVarint(out, len(names))
+            for name in names:
+                self.writeSymbol(out, name)
+        else:
+            _writeVarint(out, shapeId + 1)
+
+    def write(self, roots: list[Blueprint]):
+        self.file.write(magic + headerStruct.pack(formatVersion, len(roots)))
+
+        # Every node is prefixed by its length, so the reader can read it in one piece
+        for blueprint, attributes in self.nodes(roots):
+            out = bytearray(lengthStruct.size)
+            self.writeShape(
+                out, type(blueprint), tuple(name for name, _ in attributes)
+            )
+            for _, value in attributes:
+                self.writeValue(out, value)
+            lengthStruct.pack_into(out, 0, len(out) - lengthStruct.size)
+            self.file.write(out)
+
+
+class _BinaryReader(_NodeReader):
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+        self.symbols: list[str] = []
+        self.shapes: list[tuple[type, tuple]] = []
+
+    def readSymbol(self, data, position: int) -> tuple[str, int]:
+        symbolId, position = _readVarint(data, position)
+        if symbolId:
+            return self.symbols[symbolId - 1], position
+        length, position = _readVarint(data, position)
+        symbol = bytes(data[position : position + length]).decode()
+        self.symbols.append(symbol)
+        return symbol, position + length
+
+    def readValue(self, data, position: int):
+        tag = data[position]
+        position += 1
+        if tag == NONE:
+            return None, position
+        if tag == TRUE:
+            return True, position
+        if tag == FALSE:
+            return False, position
+        if tag == FLOAT:
+            return unpackDouble(data, position)[0], position + 8
+        if tag == INT:
+            value = data[position]
+            if value < 0x80:
+                position += 1
+            else:
+                value, position = _readVarint(data, position)
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1), position
+        if tag == STRING:
+            length, position = _readVarint(data, position)
+            return bytes(data[position : position + length]).decode(), position + length
+        if tag == LIST or tag == TUPLE:
+            length, position = _readVarint(data, position)
+            items = []
+            for _ in range(length):
+                item, position = self.readValue(data, position)
+                items.append(item)
+            return (items if tag == LIST else tuple(items)), position
+        if tag == VECTOR:
+            length = data[position]
+            values = struct.unpack_from(f"<{length}d", data, position + 1)
+            return Vector(values), position + 1 + 8 * length
+        if tag == REFERENCE:
+            index, position = _readVarint(data, position)
+            return self.reference(index), position
+        if tag == ENUM:
+            path, position = self.readSymbol(data, position)
+            name, position = self.readSymbol(data, position)
+            return resolveClass(path, Enum)[name], position
+        if tag == DICT:
+            length, position = _readVarint(data, position)
+            items = {}
+            for _ in range(length):
+                key, position = self.readValue(data, position)
+                items[key], position = self.readValue(data, position)
+            return items, position
+        raise ValueError(f"Unknown value tag {tag}")
+
+    def readShape(self, data, position: int) -> tuple[tuple[type, tuple], int]:
+        shapeId, position = _readVarint(data, position)
+        if shapeId:
+            return self.shapes[shapeId - 1], position
+        path, position = self.readSymbol(data, position)
+        nameCount, position = _readVarint(data, position)
+        names = []
+        for _ in range(nameCount):
+            name, position = self.readSymbol(data, position)
+            names.append(name)
+        shape = (resolveClass(path, Blueprint), tuple(names))
+        self.shapes.append(shape)
+        return shape, position
+
+    def read(self) -> list[Blueprint]:
+        header = self.file.read(headerStruct.size)
+        if len(header) != headerStruct.size:
+            raise ValueError("Truncated blueprint file")
+        version, rootCount = headerStruct.unpack(header)
+        if version != formatVersion:
+            raise ValueError(f"Unsupported blueprint format version {version}")
+
+        index = 0
+        readValue = self.readValue
+        while True:
+            prefix = self.file.read(lengthStruct.size)
+            if not prefix:
+                break
+            if len(prefix) != lengthStruct.size:
+                raise ValueError("Truncated blueprint file")
+            (length,) = lengthStruct.unpack(prefix)
+            data = self.file.read(length)
+            if len(data) != length:
+                raise ValueError("Truncated blueprint file")
+            (cls, names), position = self.readShape(data, 0)
+            values = []
+            for _ in names:
+                value, position = readValue(data, position)
+                values.append(value)
+            self.setNode(index, cls, dict(zip(names, values)))
+            index += 1
+
+        if len(self.nodes) > index:
+            raise ValueError("Blueprint file references missing nodes")
+        return self.nodes[:rootCount]
+
+
+# JSON lines format
+
+
+class _JsonWriter(_NodeWriter):
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+
+    def jsonValue(self, value):
+        valueType = type(value)
+        if value is None or valueType in (bool, int, float, str):
+            return value
+        if valueType is list:
+            return [self.jsonValue(item) for item in value]
+        if valueType is tuple:
+            return {"$tuple": [self.jsonValue(item) for item in value]}
+        if isinstance(value, Vector):
+            return {"$vector": list(value)}
+        if isinstance(value, Blueprint):
+            return {"$ref": self.reference(value)}
+        if isinstance(value, Enum):
+            return {"$enum": [classPath(type(value)), value.name]}
+        if isinstance(value, bool):
+            return bool(value)
+        if isinstance(value, numbers.Integral):
+            return int(value)
+        if isinstance(value, numbers.Real):
+            return float(value)
+        if isinstance(value, dict):
+            return {
+                "$dict": [
+                    [self.jsonValue(key), self.jsonValue(item)]
+                    for key, item in value.items()
+                ]
+            }
+        raise TypeError(f"Cannot serialize {valueType.__name__} values")
+
+    def writeLine(self, line: dict):
+        self.file.write(json.dumps(line, separators=(",", ":")).encode() + b"\n")
+
+    def write(self, roots: list[Blueprint]):
+        self.writeLine(
+            {"format": "blueprints", "version": formatVersion, "roots": len(roots)}
+        )
+        for index, (blueprint, attributes) in enumerate(self.nodes(roots)):
+            self.writeLine(
+                {
+                    "index": index,
+                    "type": classPath(type(blueprint)),
+                    "attributes": {
+                        name: self.jsonValue(value) for name, value in attributes
+                    },
+                }
+            )
+
+
+class _JsonReader(_NodeReader):
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+
+    def value(self, value):
+        if type(value) is list:
+            return [self.value(item) for item in value]
+        if type(value) is not dict:
+            return value
+        ((tag, content),) = value.items()
+        if tag == "$tuple":
+            return tuple(self.value(item) for item in content)
+        if tag == "$vector":
+            return Vector(content)
+        if tag == "$ref":
+            return self.reference(content)
+        if tag == "$enum":
+            return resolveClass(content[0], Enum)[content[1]]
+        if tag == "$dict":
+            return {self.value(key): self.value(item) for key, item in content}
+        raise ValueError(f"Unknown value tag {tag}")
+
+    def read(self, headerLine: bytes) -> list[Blueprint]:
+        header = json.loads(headerLine)
+        if header.get("format") != "blueprints":
+            raise ValueError("Not a blueprint file")
+        if header["version"] != formatVersion:
+            raise ValueError(f"Unsupported blueprint format version {header['version']}")
+
+        index = 0
+        for line in self.file:
+            if not line.strip():
+                continue
+            node = json.loads(line)
+            self.setNode(
+                node["index"],
+                resolveClass(node["type"], Blueprint),
+                {name: self.value(value) for name, value in node["attributes"].items()},
+            )
+            index += 1
+
+        if len(self.nodes) > index:
+            raise ValueError("Blueprint file references missing nodes")
+        return self.nodes[: header["roots"]]
+
+
+# Interface
+
+formats = {"binary": _BinaryWriter, "json": _JsonWriter}
+""" Writer class by format name. """
+
+
+def dump(roots: list[Blueprint], file, format="binary"):
+    """Writes the trees of the root blueprints and all blueprints they reference into a binary file object."""
+    if format not in formats:
+        raise ValueError(f"Unknown format {format}, use one of {', '.join(formats)}")
+    formats[format](file).write(list(roots))
+
+
+def load(file) -> list[Blueprint]:
+    """Reads the root blueprints from a binary file object written by dump() in any format."""
+    start = file.read(len(magic))
+    if start == magic:
+        return _BinaryReader(file).read()
+    return _JsonReader(file).read(start + file.readline())
+
+
+def dumps(roots: list[Blueprint], format="binary") -> bytes:
+    import io
+
+    file = io.BytesIO()
+    dump(roots, file, format)
+    return file.getvalue()
+
+
+def loads(data: bytes) -> list[Blueprint]:
+    import io
+
+    return load(io.BytesIO(data))
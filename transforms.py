@@ -0,0 +1,118 @@
+"""
+Bulk placement of created blueprints.
+
+    moveBlueprints(planks, offsets)         # (N, 3) new offsets
+    transformBlueprints(planks, matrices)   # (N, 4, 4) matrices applied on top of the current transforms
+
+The new transforms of all objects are computed at once with NumPy, without rebuilding any mesh. Locations
+are written with a single foreach_get/foreach_set pair on bpy.data.objects, other transforms per object,
+so objects that are not passed in keep their loc/rot/scale values. Box-projected UVs are projected again
+at the new placement.
+"""
+
+import numpy as np
+from mathutils import Matrix, Vector
+
+from boxbuilder import Blueprint
+
+
+def _createdObjects(blueprints: list[Blueprint]) -> list:
+    objects = [blueprint.object for blueprint in blueprints]
+    if any(object is None for object in objects):
+        raise ValueError("All blueprints must be created before they can be transformed.")
+    return objects
+
+
+def _objectRows(objects: list) -> np.ndarray:
+    """The indices of the objects in bpy.data.objects."""
+    import bpy
+
+    rows = {object.as_pointer(): row for row, object in enumerate(bpy.data.objects)}
+    return np.array([rows[object.as_pointer()] for object in objects], dtype=np.int64)
+
+
+def _readAll(attribute: str, size: int) -> np.ndarray:
+    """The attribute of all objects in bpy.data.objects as (N, size) float32 array."""
+    import bpy
+
+    values = np.empty(len(bpy.data.objects) * size, dtype=np.float32)
+    bpy.data.objects.foreach_get(attribute, values)
+    return values.reshape(-1, size)
+
+
+def _writeAll(attribute: str, values: np.ndarray):
+    import bpy
+
+    bpy.data.objects.foreach_set(attribute, np.ascontiguousarray(values, dtype=np.float32).reshape(-1))
+
+
+def _updateUvs(blueprints: list[Blueprint]):
+    """Projects the box-projected UVs of the moved blueprints and the blueprints below them again."""
+    for root in blueprints:
+        for blueprint in root.walk():
+            blueprint.updateUvs()
+
+
+def moveBlueprints(blueprints: list[Blueprint], offsets):
+    """Sets the offsets of the blueprints to the (N, 3) offsets and moves their created objects along."""
+    offsets = np.asarray(offsets, dtype=np.float64).reshape(-1, 3)
+    if len(offsets) != len(blueprints):
+        raise ValueError(f"{len(blueprints)} blueprints, but {len(offsets)} offsets")
+
+    previousOffsets = np.array(
+        [tuple(blueprint.offset) for blueprint in blueprints], dtype=np.float64
+    ).reshape(-1, 3)
+    createdIndices = [
+        index for index, blueprint in enumerate(blueprints) if blueprint.object
+    ]
+    if createdIndices:
+        rows = _objectRows([blueprints[index].object for index in createdIndices])
+        locations = _readAll("location", 3)
+        locations[rows] += (offsets - previousOffsets)[createdIndices]
+        _writeAll("location", locations)
+
+    for blueprint, offset in zip(blueprints, offsets.tolist()):
+        blueprint.offset = Vector(offset)
+    _updateUvs(blueprints)
+
+
+def translateBlueprints(blueprints: list[Blueprint], translations):
+    """Moves the blueprints and their created objects by the (N, 3) translations."""
+    translations = np.asarray(translations, dtype=np.float64).reshape(-1, 3)
+    offsets = np.array(
+        [tuple(blueprint.offset) for blueprint in blueprints], dtype=np.float64
+    ).reshape(-1, 3)
+    moveBlueprints(blueprints, offsets + translations)
+
+
+def transformBlueprints(blueprints: list[Blueprint], matrices):
+    """
+    Applies the (N, 4, 4) matrices on top of the transforms of the created objects.
+    Blueprints with a pure translation are moved with their offsets, so a rebuild keeps the placement.
+    Rotations and scales cannot be expressed by blueprints and only change the objects.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    if len(matrices) != len(blueprints):
+        raise ValueError(f"{len(blueprints)} blueprints, but {len(matrices)} matrices")
+    objects = _createdObjects(blueprints)
+
+    isTranslation = np.all(
+        np.isclose(matrices[:, :3, :3], np.identity(3)), axis=(1, 2)
+    ) & np.all(np.isclose(matrices[:, 3], (0, 0, 0, 1)), axis=1)
+    translated = np.nonzero(isTranslation)[0].tolist()
+    transformed = np.nonzero(~isTranslation)[0].tolist()
+
+    if translated:
+        translateBlueprints(
+            [blueprints[index] for index in translated], matrices[translated, :3, 3]
+        )
+    if transformed:
+        # Writing matrix_basis decomposes it into loc/rot/scale again, so only the targeted objects are set
+        transformedObjects = [objects[index] for index in transformed]
+        currentMatrices = np.array(
+            [object.matrix_basis for object in transformedObjects], dtype=np.float64
+        ).reshape(-1, 4, 4)
+        newMatrices = matrices[transformed] @ currentMatrices
+        for object, matrix in zip(transformedObjects, newMatrices.tolist()):
+            object.matrix_basis = Matrix(matrix)
+        _updateUvs([blueprints[index] for index in transformed])
@@ -0,0 +1,374 @@
+"""
+A pool of long-lived headless Blender processes that build and export serialized blueprint trees.
+
+    with WorkerPool(workerCount=4) as pool:
+        futures = [pool.submit([variant], f"out/variant{index}.glb") for index, variant in enumerate(variants)]
+        for future in futures:
+            future.result()
+
+Every worker is started once with "blender -b" and imports boxbuilder once. Jobs are sent over a local
+socket (multiprocessing.connection). Between jobs, the worker removes the objects of the previous job
+instead of reloading a file. submit() blocks while the job queue is full, and a worker that exceeds the
+timeout of a job is killed and restarted.
+
+The pool itself runs in any Python that can import mathutils, e.g. Blender or the mathutils package.
+This file is also the script run by the workers.
+"""
+
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+moduleDirectory = os.path.dirname(os.path.abspath(__file__))
+if moduleDirectory not in sys.path:
+    # Blender does not add the directory of a --python script
+    sys.path.insert(0, moduleDirectory)
+
+import buildlogging
+
+log = buildlogging.getLogger("worker")
+
+authkeyVariable = "BLUEPRINT_WORKER_AUTHKEY"
+""" The environment variable passing the connection key to the workers, so it does not show up in process lists. """
+
+exportFormats = ("glb", "gltf", "obj", "fbx", "stl", "blend", "library")
+""" The file formats a job can export. A library is a .blend with only a collection named after the file (see partitioning). """
+
+
+class JobError(RuntimeError):
+    """A job failed inside the worker. The message contains the traceback of the worker."""
+
+
+class Job:
+    """Building and exporting blueprint trees in a worker."""
+
+    def __init__(self, blueprints: bytes, exportPath: str, exportFormat: str, timeout: float):
+        self.blueprints = blueprints
+        """ The root blueprints, serialized. """
+
+        self.exportPath = exportPath
+        self.exportFormat = exportFormat
+
+        self.timeout = timeout
+        """ Seconds the worker may take before it is restarted. """
+
+        self.future = Future()
+        """ Resolves to the reply of the worker or a JobError, TimeoutError or RuntimeError. """
+
+    def message(self) -> dict:
+        return {
+            "blueprints": self.blueprints,
+            "exportPath": self.exportPath,
+            "exportFormat": self.exportFormat,
+        }
+
+
+class WorkerPool:
+    """Distributes jobs to workerCount Blender processes. Use it as a context manager or call start() and close()."""
+
+    def __init__(
+        self,
+        workerCount: int = None,
+        blenderPath="blender",
+        queueSize: int = None,
+        jobTimeout=600.0,
+        startupTimeout=120.0,
+        cacheDirectory: str = None,
+    ):
+        self.workerCount = workerCount or os.cpu_count() or 1
+        self.blenderPath = blenderPath
+
+        self.queue: queue.Queue[Job] = queue.Queue(queueSize or 2 * self.workerCount)
+        """ Jobs waiting for a worker. submit() blocks while it is full. """
+
+        self.jobTimeout = jobTimeout
+        """ The default timeout of a job in seconds. """
+
+        self.startupTimeout = startupTimeout
+        """ Seconds a worker may take to start Blender and connect. """
+
+        self.cacheDirectory = cacheDirectory
+        """ If set, the workers share this geometry cache. Entries are written atomically, so this is safe. """
+
+        self.authkey = secrets.token_bytes(32)
+        self.workers: list[_Worker] = []
+
+    def __enter__(self) -> "WorkerPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def start(self):
+        """Starts the workers. Blender is started by all workers in parallel."""
+        self.workers = [_Worker(self, index) for index in range(self.workerCount)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(
+        self,
+        roots,
+        exportPath: str,
+        exportFormat="glb",
+        timeout: float = None,
+        block=True,
+    ) -> Future:
+        """
+        Queues building the root blueprints (or their serialization) and exporting the scene.
+        Blocks while the queue is full, without block raises queue.Full instead.
+        """
+        if exportFormat not in exportFormats:
+            raise ValueError(
+                f"Unknown export format {exportFormat}, use one of {', '.join(exportFormats)}"
+            )
+        if not isinstance(roots, bytes):
+            import serialization
+
+            roots = serialization.dumps(roots)
+
+        job = Job(
+            roots,
+            os.path.abspath(exportPath),
+            exportFormat,
+            self.jobTimeout if timeout is None else timeout,
+        )
+        self.queue.put(job, block=block)
+        return job.future
+
+    def close(self):
+        """Lets the workers finish the queued jobs and stops them."""
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+
+class _Worker(threading.Thread):
+    """Runs the jobs of the queue in one Blender process and restarts the process when needed."""
+
+    def __init__(self, pool: WorkerPool, index: int):
+        super().__init__(name=f"BlueprintWorker{index}", daemon=True)
+        self.pool = pool
+        self.index = index
+        self.process: subprocess.Popen = None
+        self.connection = None
+
+    def run(self):
+        try:
+            self._startProcess()
+        except Exception:
+            # Retried with the first job, which then gets the error
+            log.exception("Worker %s could not be started", self.index)
+
+        while True:
+            job = self.pool.queue.get()
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                job.future.set_result(self._runJob(job))
+            except BaseException as exception:
+                job.future.set_exception(exception)
+        self._stopProcess()
+
+    def _startProcess(self):
+        listener = Listener(("127.0.0.1", 0), authkey=self.pool.authkey)
+        host, port = listener.address
+        command = [
+            self.pool.blenderPath,
+            "-b",
+            "--factory-startup",
+            "--python",
+            os.path.abspath(__file__),
+            "--",
+            host,
+            str(port),
+        ]
+        if self.pool.cacheDirectory:
+            command.append(self.pool.cacheDirectory)
+        environment = dict(os.environ, **{authkeyVariable: self.pool.authkey.hex()})
+        self.process = subprocess.Popen(
+            command, env=environment, stdout=subprocess.DEVNULL
+        )
+
+        # Listener.accept() has no timeout, closing the listener ends it
+        accepted = []
+
+        def accept():
+            try:
+                accepted.append(listener.accept())
+            except OSError:
+                pass
+
+        acceptThread = threading.Thread(target=accept, daemon=True)
+        acceptThread.start()
+        acceptThread.join(self.pool.startupTimeout)
+        listener.close()
+        if not accepted:
+            self._killProcess()
+            raise TimeoutError(
+                f"Worker {self.index} did not connect within {self.pool.startupTimeout} s"
+            )
+        self.connection = accepted[0]
+        log.info("Worker %s started (process %s)", self.index, self.process.pid)
+
+    def _runJob(self, job: Job) -> dict:
+        if self.connection is None:
+            self._startProcess()
+
+        try:
+            self.connection.send(job.message())
+            isReplied = self.connection.poll(job.timeout)
+            reply = self.connection.recv() if isReplied else None
+        except (EOFError, OSError) as exception:
+            self._killProcess()
+            raise RuntimeError(f"Worker {self.index} exited during the job") from exception
+
+        if not isReplied:
+            log.warning("Worker %s timed out, restarting it", self.index)
+            self._killProcess()
+            raise TimeoutError(f"Job took longer than {job.timeout} s")
+
+        if not reply["ok"]:
+            raise JobError(reply["error"])
+        return reply
+
+    def _killProcess(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def _stopProcess(self):
+        if self.connection is not None:
+            try:
+                self.connection.send(None)
+                self.process.wait(self.pool.startupTimeout)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self._killProcess()
+
+
+# Worker side, runs inside Blender
+
+
+def resetScene():
+    """Removes the objects, meshes and collections of the previous job, which is faster than loading a file."""
+    import bpy
+
+    data = bpy.data
+    data.batch_remove(list(data.objects) + list(data.meshes) + list(data.collections))
+    data.orphans_purge(do_recursive=True)
+
+
+def exportScene(path: str, exportFormat: str):
+    """Exports the whole scene. Newer Blender versions moved some exporters into wm."""
+    import bpy
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    operators = dir(bpy.ops.wm)
+    if exportFormat in ("glb", "gltf"):
+        bpy.ops.export_scene.gltf(
+            filepath=path,
+            export_format="GLB" if exportFormat == "glb" else "GLTF_SEPARATE",
+        )
+    elif exportFormat == "obj":
+        if "obj_export" in operators:
+            bpy.ops.wm.obj_export(filepath=path)
+        else:
+            bpy.ops.export_scene.obj(filepath=path)
+    elif exportFormat == "fbx":
+        bpy.ops.export_scene.fbx(filepath=path)
+    elif exportFormat == "stl":
+        if "stl_export" in operators:
+            bpy.ops.wm.stl_export(filepath=path)
+        else:
+            bpy.ops.export_mesh.stl(filepath=path)
+    elif exportFormat == "blend":
+        bpy.ops.wm.save_as_mainfile(filepath=path, copy=True)
+    else:
+        raise ValueError(f"Unknown export format {exportFormat}")
+
+
+def runJob(message: dict) -> dict:
+    """Builds the blueprints of a job message into the empty scene and exports it."""
+    import bpy
+
+    import serialization
+    from boxbuilder import BlueprintContainer
+
+    start = time.perf_counter()
+    resetScene()
+    roots = serialization.loads(message["blueprints"])
+    if message["exportFormat"] == "library":
+        import partitioning
+
+        path = message["exportPath"]
+        name = os.path.splitext(os.path.basename(path))[0]
+        return {
+            "ok": True,
+            "exportPath": path,
+            "objects": partitioning.writeLibrary(roots, name, path),
+            "seconds": time.perf_counter() - start,
+        }
+
+    for root in roots:
+        if isinstance(root, BlueprintContainer):
+            root.createBatched()
+        else:
+            root.create()
+    exportScene(message["exportPath"], message["exportFormat"])
+    return {
+        "ok": True,
+        "exportPath": message["exportPath"],
+        "objects": len(bpy.data.objects),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def serve(host: str, port: int, authkey: bytes, cacheDirectory: str = None):
+    """Connects to the pool and runs jobs until the pool sends None or disconnects."""
+    # Loaded once per worker instead of once per job
+    import boxbuilder
+    import serialization  # noqa: F401
+
+    if cacheDirectory:
+        boxbuilder.enableGeometryCache(cacheDirectory)
+
+    connection = Client((host, port), authkey=authkey)
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        try:
+            reply = runJob(message)
+        except Exception:
+            reply = {"ok": False, "error": traceback.format_exc()}
+        connection.send(reply)
+    connection.close()
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[sys.argv.index("--") + 1 :]
+    serve(
+        arguments[0],
+        int(arguments[1]),
+        bytes.fromhex(os.environ[authkeyVariable]),
+        arguments[2] if len(arguments) > 2 else None,
+    )